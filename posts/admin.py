@@ -1,4 +1,5 @@
 from django.contrib import admin
+from . import search
 from .models import Group, Post, Comment, Follow
 
 
@@ -25,6 +26,12 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Searches the full-text index instead of LIKE over the table"""
+        if not search_term:
+            return queryset, False
+        return search.filter_matching(queryset, search_term), False
+
 
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
@@ -0,0 +1,246 @@
+import hashlib
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import Http404, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_safe
+
+from yatube import routers
+
+from . import fragments
+from .models import Comment, Group, Post
+from .paginator import NEXT, POSTS_PER_PAGE, decode_cursor, make_cursor
+from .stats import get_stats
+
+USER = get_user_model()
+MAX_LIMIT = 100
+
+# API field name -> lookup read with values_list().
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+}
+
+
+class ApiError(Exception):
+    """Malformed request, answered with 400"""
+
+
+def api_view(scopes):
+    """Read-only JSON endpoint with strong ETags
+
+    ``scopes`` gets the view arguments and returns the content version
+    scopes the response is built from, raising Http404 if its object is
+    missing. The ETag hashes the full path with their versions, so a
+    matching If-None-Match is answered with 304 before the view runs.
+    """
+
+    def decorator(view):
+        @require_safe
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            try:
+                versions = ':'.join(map(str, (
+                    *fragments.versions(*scopes(*args, **kwargs)),
+                    *routers.cache_variant()
+                )))
+                etag = '"{}"'.format(hashlib.md5(
+                    f'{request.get_full_path()}|{versions}'.encode()
+                ).hexdigest())
+                response = get_conditional_response(request, etag=etag)
+                if response is None:
+                    response = JsonResponse(
+                        view(request, *args, **kwargs),
+                        encoder=DjangoJSONEncoder,
+                        json_dumps_params={'ensure_ascii': False}
+                    )
+            except Http404:
+                return JsonResponse({'detail': 'Not found'}, status=404)
+            except ApiError as error:
+                return JsonResponse({'detail': str(error)}, status=400)
+            response['ETag'] = etag
+            return response
+        return wrapper
+    return decorator
+
+
+def requested_fields(request, fields):
+    """Field names from ?fields=, all of them by default"""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(fields)
+    names = [name for name in raw.split(',') if name]
+    unknown = [name for name in names if name not in fields]
+    if unknown:
+        raise ApiError(f'Unknown fields: {", ".join(unknown)}')
+    return names
+
+
+def page_limit(request):
+    try:
+        limit = int(request.GET.get('limit', POSTS_PER_PAGE))
+    except ValueError:
+        raise ApiError('limit must be a number')
+    return min(max(limit, 1), MAX_LIMIT)
+
+
+def after_cursor(request, queryset, date_field):
+    """Rows after ?cursor= in (date, id) order, newest first"""
+    cursor = request.GET.get('cursor')
+    if cursor:
+        decoded = decode_cursor(cursor)
+        if decoded is None or decoded[0] != NEXT:
+            raise ApiError('Malformed cursor')
+        _, date, pk = decoded
+        queryset = queryset.filter(
+            Q(**{f'{date_field}__lte': date})
+            & ~Q(**{date_field: date, 'pk__gte': pk})
+        )
+    return queryset.order_by(f'-{date_field}', '-pk')
+
+
+def to_dict(names, row):
+    item = dict(zip(names, row))
+    image = item.get('image')
+    if 'image' in item:
+        item['image'] = default_storage.url(image) if image else None
+    return item
+
+
+def listing(request, queryset, fields, date_field):
+    """A page of rows as dicts plus the link to the next page
+
+    Rows are read with values_list(), no model instances are built.
+    """
+
+    names = requested_fields(request, fields)
+    limit = page_limit(request)
+    rows = list(after_cursor(request, queryset, date_field).values_list(
+        *[fields[name] for name in names], date_field, 'pk'
+    )[:limit + 1])
+    next_url = None
+    if len(rows) > limit:
+        params = request.GET.copy()
+        params['cursor'] = make_cursor(NEXT, *rows[limit - 1][-2:])
+        next_url = f'{request.path}?{params.urlencode()}'
+    return {
+        'results': [to_dict(names, row[:-2]) for row in rows[:limit]],
+        'next': next_url,
+    }
+
+
+def detail(request, queryset, fields):
+    names = requested_fields(request, fields)
+    row = queryset.values_list(*[fields[name] for name in names]).first()
+    if row is None:
+        raise Http404
+    return to_dict(names, row)
+
+
+def group_id(slug):
+    pk = Group.objects.filter(slug=slug).values_list('id', flat=True).first()
+    if pk is None:
+        raise Http404
+    return pk
+
+
+def user_id(username):
+    pk = USER.objects.filter(username=username).values_list(
+        'id', flat=True
+    ).first()
+    if pk is None:
+        raise Http404
+    return pk
+
+
+def post_author_id(post_id):
+    pk = Post.objects.filter(pk=post_id).values_list(
+        'author', flat=True
+    ).first()
+    if pk is None:
+        raise Http404
+    return pk
+
+
+def user_scopes(username):
+    pk = user_id(username)
+    return [f'author:{pk}', f'stats:{pk}']
+
+
+@api_view(lambda: ['posts'])
+def post_list(request):
+    return listing(request, Post.objects.for_feed(), POST_FIELDS, 'pub_date')
+
+
+@api_view(lambda post_id: [f'author:{post_author_id(post_id)}'])
+def post_detail(request, post_id):
+    return detail(
+        request, Post.objects.for_feed().filter(pk=post_id), POST_FIELDS
+    )
+
+
+@api_view(lambda post_id: [f'author:{post_author_id(post_id)}'])
+def comment_list(request, post_id):
+    return listing(
+        request,
+        Comment.objects.filter(post=post_id),
+        COMMENT_FIELDS,
+        'created'
+    )
+
+
+@api_view(lambda slug: [f'group:{group_id(slug)}'])
+def group_detail(request, slug):
+    return Group.objects.filter(slug=slug).values(
+        'id', 'title', 'slug', 'description'
+    ).first()
+
+
+@api_view(lambda slug: [f'group:{group_id(slug)}'])
+def group_post_list(request, slug):
+    return listing(
+        request,
+        Post.objects.for_feed().filter(group__slug=slug),
+        POST_FIELDS,
+        'pub_date'
+    )
+
+
+@api_view(user_scopes)
+def user_detail(request, username):
+    user = USER.objects.only(
+        'id', 'username', 'first_name', 'last_name'
+    ).get(username=username)
+    stats = get_stats(user)
+    return {
+        'username': user.username,
+        'name': user.get_full_name(),
+        'posts_count': stats.posts_count,
+        'followers_count': stats.followers_count,
+        'following_count': stats.following_count,
+    }
+
+
+@api_view(lambda username: [f'author:{user_id(username)}'])
+def user_post_list(request, username):
+    return listing(
+        request,
+        Post.objects.for_feed().filter(author__username=username),
+        POST_FIELDS,
+        'pub_date'
+    )
@@ -0,0 +1,20 @@
+from django.urls import path
+from . import api
+
+app_name = 'api'
+
+urlpatterns = [
+    path('posts/', api.post_list, name='post_list'),
+    path('posts/<int:post_id>/', api.post_detail, name='post_detail'),
+    path('posts/<int:post_id>/comments/',
+         api.comment_list, name='comment_list'
+         ),
+    path('groups/<slug:slug>/', api.group_detail, name='group_detail'),
+    path('groups/<slug:slug>/posts/',
+         api.group_post_list, name='group_post_list'
+         ),
+    path('users/<str:username>/', api.user_detail, name='user_detail'),
+    path('users/<str:username>/posts/',
+         api.user_post_list, name='user_post_list'
+         ),
+]
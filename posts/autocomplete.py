@@ -0,0 +1,228 @@
+import time
+from bisect import bisect_left
+from operator import itemgetter
+from threading import Lock, Thread
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Q
+from django.urls import reverse
+
+from . import fragments
+from .models import Group
+
+USER = get_user_model()
+
+# Content version scopes: new users are read incrementally, deleted and
+# renamed ones need a full reload, groups are few and read whole on any
+# change.
+USERS_SCOPE = 'autocomplete:users'
+RELOAD_SCOPE = 'autocomplete:reload'
+GROUPS_SCOPE = 'autocomplete:groups'
+USER_KIND = 'user'
+GROUP_KIND = 'group'
+
+
+def result_limit():
+    return getattr(settings, 'AUTOCOMPLETE_LIMIT', 10)
+
+
+def sync_interval():
+    """Seconds between checks of the content versions"""
+    return getattr(settings, 'AUTOCOMPLETE_SYNC_INTERVAL', 1)
+
+
+class PrefixIndex:
+    """Sorted array of keys with parallel items, searched by bisection
+
+    An item is a tuple starting with its kind and primary key; it may be
+    reachable through several keys.
+    """
+
+    def __init__(self, entries=()):
+        entries = sorted(entries, key=itemgetter(0))
+        self.keys = [key for key, _ in entries]
+        self.items = [item for _, item in entries]
+
+    def copy(self):
+        index = PrefixIndex()
+        index.keys = self.keys.copy()
+        index.items = self.items.copy()
+        return index
+
+    def add(self, key, item):
+        position = bisect_left(self.keys, key)
+        self.keys.insert(position, key)
+        self.items.insert(position, item)
+
+    def remove_kind(self, kind):
+        kept = [
+            (key, item) for key, item in zip(self.keys, self.items)
+            if item[0] != kind
+        ]
+        self.keys = [key for key, _ in kept]
+        self.items = [item for _, item in kept]
+
+    def search(self, prefix, limit):
+        found = {}
+        position = bisect_left(self.keys, prefix)
+        while (position < len(self.keys) and len(found) < limit
+               and self.keys[position].startswith(prefix)):
+            item = self.items[position]
+            found.setdefault(item[:2], item)
+            position += 1
+        return list(found.values())
+
+
+def user_entries(queryset):
+    for pk, username in queryset.values_list('pk', 'username').iterator():
+        yield username.casefold(), (USER_KIND, pk, username)
+
+
+def group_entries():
+    for pk, title, slug in Group.objects.values_list('pk', 'title', 'slug'):
+        item = (GROUP_KIND, pk, title, slug)
+        yield title.casefold(), item
+        yield slug.casefold(), item
+
+
+class Autocomplete:
+    """Process-wide prefix index over usernames and group titles and slugs
+
+    It is built in a background thread, started with the process by
+    warm(), and then follows the content versions of its scopes, which
+    signals bump in every process, checked at most once a sync_interval().
+    Full reloads happen in the background too, lookups meanwhile use the
+    index at hand, or the database before the first one is built.
+    Otherwise lookups never touch the database.
+
+    A built index is never changed: changes are applied to a copy, made
+    outside the lock, and swapped in, so lookups don't wait for them.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._index = None
+        self._versions = None
+        self._max_user_pk = 0
+        self._checked = None
+        self._builder = None
+
+    def warm(self):
+        """Starts building the index unless it is built or being built"""
+        with self._lock:
+            if self._index is None:
+                self._build_later()
+
+    def join(self, timeout=None):
+        """Waits for the build in progress, if any"""
+        builder = self._builder
+        if builder is not None:
+            builder.join(timeout)
+
+    def _build_later(self):
+        if self._builder is None or not self._builder.is_alive():
+            self._builder = Thread(
+                target=self._build, name='autocomplete', daemon=True
+            )
+            self._builder.start()
+
+    def _build(self):
+        try:
+            # Versions first: writes made during the load bump them again.
+            versions = fragments.versions(
+                USERS_SCOPE, RELOAD_SCOPE, GROUPS_SCOPE
+            )
+            users = list(user_entries(USER.objects.all()))
+            index = PrefixIndex(users + list(group_entries()))
+            with self._lock:
+                self._index = index
+                self._versions = versions
+                self._max_user_pk = max(
+                    (item[1] for _, item in users), default=0
+                )
+        finally:
+            connection.close()
+
+    def _sync(self):
+        now = time.monotonic()
+        with self._lock:
+            if (self._checked is not None
+                    and now - self._checked < sync_interval()):
+                return
+            self._checked = now
+            index, known = self._index, self._versions
+            max_user_pk = self._max_user_pk
+        versions = fragments.versions(
+            USERS_SCOPE, RELOAD_SCOPE, GROUPS_SCOPE
+        )
+        if versions == known:
+            return
+        if index is None or versions[1] != known[1]:
+            with self._lock:
+                self._build_later()
+            return
+        updated = index.copy()
+        if versions[0] != known[0]:
+            queryset = USER.objects.filter(pk__gt=max_user_pk)
+            for key, item in user_entries(queryset):
+                updated.add(key, item)
+                max_user_pk = max(max_user_pk, item[1])
+        if versions[2] != known[2]:
+            updated.remove_kind(GROUP_KIND)
+            for key, item in group_entries():
+                updated.add(key, item)
+        with self._lock:
+            # A build that finished meanwhile has read everything anew.
+            if self._index is index:
+                self._index = updated
+                self._versions = versions
+                self._max_user_pk = max_user_pk
+
+    def lookup(self, query, limit=None):
+        """Users and groups with a name starting with the query"""
+        prefix, limit = query.casefold(), limit or result_limit()
+        self._sync()
+        index = self._index
+        if index is not None:
+            return [serialize(item) for item in index.search(prefix, limit)]
+        return [serialize(item) for item in search_database(query, limit)]
+
+
+def search_database(query, limit):
+    """What the index would find, read from the tables while it is built"""
+
+    users = USER.objects.filter(username__istartswith=query).order_by(
+        'username'
+    )[:limit]
+    groups = Group.objects.filter(
+        Q(title__istartswith=query) | Q(slug__istartswith=query)
+    ).order_by('title')[:limit]
+    items = [
+        (USER_KIND, pk, username)
+        for pk, username in users.values_list('pk', 'username')
+    ] + [
+        (GROUP_KIND, pk, title, slug)
+        for pk, title, slug in groups.values_list('pk', 'title', 'slug')
+    ]
+    return sorted(items, key=lambda item: item[2].casefold())[:limit]
+
+
+def serialize(item):
+    if item[0] == USER_KIND:
+        _, _, username = item
+        return {
+            'type': USER_KIND,
+            'label': username,
+            'url': reverse('profile', args=[username]),
+        }
+    _, _, title, slug = item
+    return {
+        'type': GROUP_KIND,
+        'label': title,
+        'url': reverse('group_posts', args=[slug]),
+    }
+
+
+index = Autocomplete()
@@ -0,0 +1,81 @@
+import csv
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Post
+
+FORMATS = ('jsonl', 'csv')
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+# Posts and comments share one set of CSV columns.
+COLUMNS = ('type', 'id', 'date', 'post', 'group', 'image', 'text')
+
+
+def chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+
+def records(user_id):
+    """Posts and then comments of the user as dicts, oldest first
+
+    Rows come from values_list().iterator(), so only one chunk of them
+    is held in memory at a time.
+    """
+
+    posts = Post.objects.filter(author=user_id).order_by(
+        'pub_date', 'pk'
+    ).values_list('pk', 'pub_date', 'group__slug', 'image', 'text')
+    for pk, date, group, image, text in posts.iterator(chunk_size()):
+        yield {
+            'type': 'post',
+            'id': pk,
+            'date': date,
+            'group': group,
+            'image': default_storage.url(image) if image else None,
+            'text': text,
+        }
+    comments = Comment.objects.filter(author=user_id).order_by(
+        'created', 'pk'
+    ).values_list('pk', 'created', 'post', 'text')
+    for pk, date, post, text in comments.iterator(chunk_size()):
+        yield {
+            'type': 'comment',
+            'id': pk,
+            'date': date,
+            'post': post,
+            'text': text,
+        }
+
+
+class Echo:
+    """File-like object that hands written lines back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+def jsonl_lines(rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(row) + '\n'
+
+
+def csv_lines(rows):
+    writer = csv.DictWriter(Echo(), COLUMNS)
+    yield writer.writeheader()
+    for row in rows:
+        if row['date'] is not None:
+            row['date'] = row['date'].isoformat()
+        yield writer.writerow(row)
+
+
+def lines(user_id, export_format):
+    """Lines of the export in the given format, generated lazily"""
+
+    if export_format == 'csv':
+        return csv_lines(records(user_id))
+    return jsonl_lines(records(user_id))
@@ -0,0 +1,165 @@
+from django.contrib.auth import get_user_model
+from django.contrib.syndication.views import Feed
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+
+from .models import Follow, Group, Post
+from .pagecache import anonymous_page_cache, group_validators
+
+USER = get_user_model()
+ITEMS = 20
+TOKEN_SALT = 'posts.feeds.follow'
+
+
+def follow_token(user):
+    """Secret of the user's follow feed URL
+
+    It is derived from the password hash, so changing the password
+    revokes the links handed out before.
+    """
+
+    digest = salted_hmac(TOKEN_SALT, f'{user.pk}:{user.password}')
+    return f'{user.pk}-{digest.hexdigest()[:32]}'
+
+
+def token_user(token):
+    """User the follow feed token belongs to, or None"""
+
+    pk, _, _ = token.partition('-')
+    if not pk.isdigit():
+        return None
+    user = USER.objects.filter(pk=pk).only('pk', 'password').first()
+    if user is None or not constant_time_compare(token, follow_token(user)):
+        return None
+    return user
+
+
+def followed_posts(user_id):
+    return Post.objects.filter(
+        author__in=Follow.objects.filter(user=user_id).values('author')
+    )
+
+
+def latest(posts):
+    return posts.select_related(
+        'author', 'group'
+    ).order_by('-pub_date', '-pk')[:ITEMS]
+
+
+def profile_validators(request, username):
+    user_id = USER.objects.filter(username=username).values_list(
+        'id', flat=True
+    ).first()
+    if user_id is None:
+        return None
+    return [f'author:{user_id}']
+
+
+def follow_validators(request, token):
+    user = token_user(token)
+    if user is None:
+        return None
+    authors = Follow.objects.filter(user=user).values_list(
+        'author', flat=True
+    )
+    return [f'follow:{user.pk}'] + [f'author:{pk}' for pk in authors]
+
+
+class PostFeed(Feed):
+    """Latest posts of some selection, newest first"""
+
+    def item_title(self, post):
+        return Truncator(post.text).words(8)
+
+    def item_description(self, post):
+        return post.text
+
+    def item_link(self, post):
+        return reverse('post', args=[post.author.username, post.id])
+
+    def item_pubdate(self, post):
+        return post.pub_date
+
+    def item_author_name(self, post):
+        return post.author.get_full_name() or post.author.username
+
+    def item_categories(self, post):
+        return [post.group.title] if post.group else []
+
+
+class GroupFeed(PostFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, group):
+        return f'Записи сообщества {group.title}'
+
+    def link(self, group):
+        return reverse('group_posts', args=[group.slug])
+
+    def description(self, group):
+        return group.description
+
+    def items(self, group):
+        return latest(Post.objects.filter(group=group))
+
+
+class ProfileFeed(PostFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(USER, username=username)
+
+    def title(self, user):
+        return f'Записи {user.get_full_name() or user.username}'
+
+    def link(self, user):
+        return reverse('profile', args=[user.username])
+
+    def description(self, user):
+        return self.title(user)
+
+    def items(self, user):
+        return latest(Post.objects.filter(author=user))
+
+
+class FollowFeed(PostFeed):
+    title = 'Избранные авторы'
+    description = 'Записи авторов, на которых вы подписаны'
+
+    def get_object(self, request, token):
+        user = token_user(token)
+        if user is None:
+            raise Http404
+        return user
+
+    def link(self):
+        return reverse('follow_index')
+
+    def items(self, user):
+        return latest(followed_posts(user.pk))
+
+
+class GroupAtomFeed(GroupFeed):
+    feed_type = Atom1Feed
+    subtitle = GroupFeed.description
+
+
+class ProfileAtomFeed(ProfileFeed):
+    feed_type = Atom1Feed
+    subtitle = ProfileFeed.description
+
+
+class FollowAtomFeed(FollowFeed):
+    feed_type = Atom1Feed
+    subtitle = FollowFeed.description
+
+
+group_rss = anonymous_page_cache(group_validators)(GroupFeed())
+group_atom = anonymous_page_cache(group_validators)(GroupAtomFeed())
+profile_rss = anonymous_page_cache(profile_validators)(ProfileFeed())
+profile_atom = anonymous_page_cache(profile_validators)(ProfileAtomFeed())
+follow_rss = anonymous_page_cache(follow_validators)(FollowFeed())
+follow_atom = anonymous_page_cache(follow_validators)(FollowAtomFeed())
@@ -1,4 +1,5 @@
 from django import forms
+from .ingest import ingest, keep_originals
 from .models import Post, Comment
 
 
@@ -8,6 +9,15 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def save(self, commit=True):
+        upload = self.cleaned_data.get('image')
+        if upload and 'image' in self.changed_data:
+            compact = ingest(upload)
+            if compact is not None:
+                self.instance.image = compact
+                self.instance.original = upload if keep_originals() else None
+        return super().save(commit)
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,110 @@
+import math
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from yatube import routers
+
+VERSION_KEY = 'fragments:version:{}'
+MODIFIED_KEY = 'fragments:modified:{}'
+# Pages are only dated once their newest bump is this many seconds old:
+# a later bump then always gets a later HTTP date, which has whole
+# seconds, so If-Modified-Since never matches content it predates.
+SETTLE_SECONDS = 1
+
+
+def _now():
+    return time.time()
+
+
+def _fresh_version():
+    # A lost counter restarts from the clock, so keys built from an
+    # evicted version are never reused.
+    return int(_now() * 1000)
+
+
+def versions(*scopes):
+    """Current content versions of the scopes, in the given order"""
+
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for scope, key in zip(scopes, keys):
+        if key not in found:
+            if cache.add(key, _fresh_version(), None):
+                cache.set(MODIFIED_KEY.format(scope), _now(), None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def last_modified(*scopes):
+    """HTTP timestamp of the latest bump of the scopes, None when recent
+
+    A scope whose time is lost counts as modified now.
+    """
+
+    keys = [MODIFIED_KEY.format(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    now = _now()
+    for key in keys:
+        if key not in found:
+            cache.add(key, now, None)
+            found[key] = cache.get(key, now)
+    modified = max(found.values(), default=now)
+    if now - modified < SETTLE_SECONDS:
+        return None
+    return math.ceil(modified)
+
+
+def bump(*scopes):
+    """Invalidates every fragment that depends on the scopes"""
+
+    for scope in scopes:
+        key = VERSION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _fresh_version(), None)
+    # Dated after the versions move: a page read in between has the new
+    # versions and the old date, never new date with old content.
+    now = _now()
+    cache.set_many(
+        {MODIFIED_KEY.format(scope): now for scope in scopes}, None
+    )
+
+
+def bump_on_commit(*scopes):
+    """bump() once the transaction in progress commits, at once outside one
+
+    A page read between the bump and the commit would still show the old
+    content, and be cached under the new versions.
+    """
+
+    transaction.on_commit(partial(bump, *scopes))
+
+
+def post_scopes(post):
+    """Scopes whose pages show the post"""
+    return 'posts', f'group:{post.group_id}', f'author:{post.author_id}'
+
+
+def feed_cache(request, view, page, *scopes):
+    """Context for the ``{% cache %}`` tag around a page of post cards
+
+    The key covers the view, the page cursor and the versions of the
+    scopes the page is built from. Cards show edit links to their author,
+    so a signed-in viewer is part of the key too, and so is the replica
+    the page was read from, see routers.cache_variant.
+    """
+
+    parts = [view, request.user.id or 0, page.cursor or '', page.number]
+    parts += versions(*scopes)
+    parts += routers.cache_variant()
+    return {
+        'cache_key': ':'.join(str(part) for part in parts),
+        'cache_timeout': routers.cache_timeout(
+            getattr(settings, 'FEED_CACHE_TIMEOUT', 60 * 60)
+        ),
+    }
@@ -0,0 +1,131 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from threading import Lock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+from yatube.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+_pool = None
+_pool_workers = None
+_pool_lock = Lock()
+
+
+def max_size():
+    return getattr(settings, 'IMAGE_MAX_SIZE', 1920)
+
+
+def image_format():
+    return getattr(settings, 'IMAGE_FORMAT', 'JPEG')
+
+
+def quality():
+    return getattr(settings, 'IMAGE_QUALITY', 82)
+
+
+def keep_originals():
+    return getattr(settings, 'IMAGE_KEEP_ORIGINALS', False)
+
+
+def workers():
+    return getattr(settings, 'IMAGE_INGEST_WORKERS', 2)
+
+
+def flatten(image):
+    """RGB image with any transparency laid over white"""
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def reencode(data, max_size, image_format, quality):
+    """Image bytes bounded to max_size pixels and saved without metadata
+
+    Runs in the worker processes, so it takes plain values only.
+    """
+
+    with Image.open(BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+        if image_format == 'JPEG':
+            image = flatten(image)
+        elif image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+        # EXIF, ICC profiles and comments are not carried over.
+        image.info = {}
+        output = BytesIO()
+        if image_format == 'JPEG':
+            image.save(
+                output, 'JPEG',
+                quality=quality, optimize=True, progressive=True
+            )
+        else:
+            image.save(output, image_format, quality=quality, method=6)
+        return output.getvalue()
+
+
+def pool():
+    """Process pool sized by IMAGE_INGEST_WORKERS
+
+    A pool of another size, left from before the setting changed, is shut
+    down and replaced.
+    """
+
+    global _pool, _pool_workers
+    count = workers()
+    with _pool_lock:
+        if _pool_workers != count:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # Spawned processes do not inherit the threads and
+            # connections of the request worker.
+            _pool = ProcessPoolExecutor(
+                max_workers=count,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            _pool_workers = count
+    return _pool
+
+
+def process(data):
+    """Re-encodes the bytes in the process pool, or inline without one"""
+
+    args = (data, max_size(), image_format(), quality())
+    if not workers():
+        return reencode(*args)
+    return pool().submit(reencode, *args).result()
+
+
+def ingest(upload):
+    """Compact copy of an uploaded image, or None if it can't be read
+
+    The request thread only waits on the pool, so other threads of the
+    worker keep serving while Pillow decodes and encodes.
+    """
+
+    upload.seek(0)
+    try:
+        data = process(upload.read())
+    except Exception:
+        # The form then stores the upload as it came.
+        logger.warning(
+            'Ingest of %s failed, keeping the upload', upload.name,
+            exc_info=True
+        )
+        registry.add('yatube_ingest_fallbacks_total')
+        return None
+    finally:
+        upload.seek(0)
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+    return ContentFile(data, name=f'{stem}.{EXTENSIONS[image_format()]}')
@@ -0,0 +1,31 @@
+from django.core.cache import cache
+from sorl.thumbnail.images import deserialize_image_file
+from sorl.thumbnail.kvstores.base import KVStoreBase, add_prefix
+
+
+class CacheKVStore(KVStoreBase):
+    """sorl key-value store kept only in the shared cache
+
+    Thumbnail workers never write to the database, so they do not compete
+    with requests for the SQLite write lock. A lost entry is restored on
+    the next lookup from the thumbnail file already on disk.
+    """
+
+    def get_many(self, image_files):
+        """Stored image files by key, in one cache round-trip"""
+        keys = {add_prefix(image_file.key): image_file.key
+                for image_file in image_files}
+        found = cache.get_many(keys)
+        return {
+            keys[raw_key]: deserialize_image_file(value)
+            for raw_key, value in found.items() if value
+        }
+
+    def _get_raw(self, key):
+        return cache.get(key)
+
+    def _set_raw(self, key, value):
+        cache.set(key, value, None)
+
+    def _delete_raw(self, *keys):
+        cache.delete_many(keys)
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import timeline
+from posts.models import Follow
+
+
+class Command(BaseCommand):
+    help = (
+        'Backfills the timelines of follows missing posts of their author, '
+        'e.g. after the author dropped back to push mode'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--author', type=int, help='Only the follows of this author id'
+        )
+
+    def handle(self, *args, **options):
+        follows = Follow.objects.filter(backfilled_from__isnull=False)
+        if options['author'] is not None:
+            follows = follows.filter(author=options['author'])
+        complete = count = 0
+        for follow in follows.order_by('pk').iterator():
+            with transaction.atomic():
+                timeline.refill(follow)
+            count += 1
+            complete += follow.backfilled_from is None
+        self.stdout.write(self.style.SUCCESS(
+            f'Backfilled {count} follows, {complete} of them complete'
+        ))
@@ -0,0 +1,202 @@
+import json
+import math
+import platform
+import time
+from collections import Counter
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+
+from posts import urls
+from posts.feeds import follow_token
+from posts.models import Comment, Follow, Group, Post
+
+USER = get_user_model()
+# URLs that only accept writes or redirect, and the error handlers.
+SKIPPED = {'profile_follow', 'profile_unfollow', 'add_comment', '404', '500'}
+
+
+def percentile(values, share):
+    """Nearest-rank percentile of the values"""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(share * len(ordered)) - 1, 0)]
+
+
+def samples():
+    """Objects the URLs are filled with: the busiest of each kind"""
+
+    author = USER.objects.annotate(
+        count=Count('posts')
+    ).order_by('-count', 'pk').first()
+    reader = USER.objects.annotate(
+        count=Count('follower')
+    ).order_by('-count', 'pk').first()
+    group = Group.objects.annotate(
+        count=Count('posts')
+    ).order_by('-count', 'pk').first()
+    post = Post.objects.filter(author=author).order_by('-pub_date').first()
+    if None in (author, reader, group, post):
+        raise CommandError('Nothing to measure, run manage.py seed first')
+    words = [word for word in post.text.split() if len(word) > 3]
+    return {
+        'author': author,
+        'reader': reader,
+        'group': group,
+        'post': post,
+        'word': words[0].strip('.,') if words else post.text[:10],
+    }
+
+
+def targets(sample):
+    """(url name, path, logged in user or None) of every GET page"""
+
+    author, reader = sample['author'], sample['reader']
+    group, post = sample['group'], sample['post']
+    token = follow_token(reader)
+    return [
+        ('index', reverse('index'), None),
+        ('group_posts', reverse('group_posts', args=[group.slug]), None),
+        ('group_rss', reverse('group_rss', args=[group.slug]), None),
+        ('group_atom', reverse('group_atom', args=[group.slug]), None),
+        ('new_post', reverse('new_post'), author),
+        ('follow_index', reverse('follow_index'), reader),
+        ('follow_rss', reverse('follow_rss', args=[token]), None),
+        ('follow_atom', reverse('follow_atom', args=[token]), None),
+        ('search', f'{reverse("search")}?q={sample["word"]}', None),
+        ('autocomplete',
+         f'{reverse("autocomplete")}?q={author.username[:2]}', None),
+        ('export', reverse('export', args=[author.username]), author),
+        ('profile_rss', reverse('profile_rss', args=[author.username]), None),
+        ('profile_atom',
+         reverse('profile_atom', args=[author.username]), None),
+        ('profile', reverse('profile', args=[author.username]), None),
+        ('post', reverse('post', args=[author.username, post.pk]), None),
+        ('post_edit',
+         reverse('post_edit', args=[author.username, post.pk]), author),
+    ]
+
+
+def measure(client, path, requests, cold):
+    durations, queries, statuses = [], [], Counter()
+    for _ in range(requests):
+        if cold:
+            cache.clear()
+        start = time.perf_counter()
+        response = client.get(path)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        durations.append(time.perf_counter() - start)
+        queries.append(response.query_stats.count)
+        statuses[str(response.status_code)] += 1
+    total = sum(durations)
+    return {
+        'requests': requests,
+        'throughput_rps': round(requests / total, 1),
+        'mean_ms': round(total / requests * 1000, 2),
+        'p50_ms': round(percentile(durations, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(durations, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(durations, 0.99) * 1000, 2),
+        'queries': round(sum(queries) / requests, 2),
+        'max_queries': max(queries),
+        'statuses': dict(statuses),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Measures latency and queries of every page of the posts app'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Measured requests per URL'
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=5,
+            help='Requests per URL made before measuring'
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Clear the cache before every request'
+        )
+        parser.add_argument(
+            '--only', nargs='+', metavar='URL_NAME',
+            help='Measure only these URLs'
+        )
+        parser.add_argument('--output', help='JSON file for the results')
+        parser.add_argument(
+            '--baseline', help='Earlier JSON results to compare with'
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests must be positive')
+        plan = targets(samples())
+        covered = {name for name, _, _ in plan}
+        missing = {
+            pattern.name for pattern in urls.urlpatterns
+        } - covered - SKIPPED
+        if missing:
+            self.stderr.write(f'No target for {", ".join(sorted(missing))}')
+        if options['only']:
+            plan = [target for target in plan if target[0] in options['only']]
+
+        results = {}
+        for name, path, user in plan:
+            client = Client()
+            if user is not None:
+                client.force_login(user)
+            for _ in range(options['warmup']):
+                client.get(path)
+            results[name] = measure(
+                client, path, options['requests'], options['cold']
+            )
+            self.report(name, results[name])
+
+        report = {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'cold': options['cold'],
+            'rows': {
+                'users': USER.objects.count(),
+                'groups': Group.objects.count(),
+                'posts': Post.objects.count(),
+                'comments': Comment.objects.count(),
+                'follows': Follow.objects.count(),
+            },
+            'results': results,
+        }
+        if options['baseline']:
+            self.compare(options['baseline'], results)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2, sort_keys=True)
+                output.write('\n')
+
+    def report(self, name, result):
+        self.stdout.write(
+            f'{name:<14} {result["throughput_rps"]:>8.1f} rps  '
+            f'p50 {result["p50_ms"]:>7.2f}  p95 {result["p95_ms"]:>7.2f}  '
+            f'p99 {result["p99_ms"]:>7.2f} ms  '
+            f'{result["queries"]:>5.1f} queries'
+        )
+
+    def compare(self, path, results):
+        with open(path) as baseline:
+            before = json.load(baseline)['results']
+        self.stdout.write(f'Compared with {path}:')
+        for name, result in results.items():
+            if name not in before:
+                continue
+            old = before[name]
+            self.stdout.write(
+                f'{name:<14} p95 {old["p95_ms"]:>7.2f} -> '
+                f'{result["p95_ms"]:>7.2f} ms  '
+                f'queries {old["queries"]:>5.1f} -> {result["queries"]:>5.1f}'
+            )
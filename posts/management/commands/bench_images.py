@@ -0,0 +1,80 @@
+import os
+import time
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from posts import ingest
+from posts.paginator import POSTS_PER_PAGE
+
+# Orientation and camera tags a phone writes into every photo.
+PHONE_EXIF = {0x0112: 6, 0x010F: 'Phone', 0x0110: 'Camera 12 Pro'}
+
+
+def phone_photo(width, height, seed):
+    """JPEG bytes resembling a phone photo: large, detailed, with EXIF"""
+    gradient = Image.linear_gradient('L').resize((width, height))
+    noise = Image.effect_noise((width, height), 6 + seed % 4)
+    image = Image.merge('RGB', (gradient, noise, gradient.rotate(180)))
+    exif = Image.Exif()
+    for tag, value in PHONE_EXIF.items():
+        exif[tag] = value
+    output = BytesIO()
+    image.save(output, 'JPEG', quality=95, exif=exif.tobytes())
+    return output.getvalue()
+
+
+class Command(BaseCommand):
+    help = 'Compares image bytes per feed page before and after ingest'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source',
+            help='Directory of real uploads to use instead of generated ones'
+        )
+        parser.add_argument(
+            '--photos', type=int, default=POSTS_PER_PAGE,
+            help='Generated photos, when no source is given'
+        )
+        parser.add_argument('--width', type=int, default=4032)
+        parser.add_argument('--height', type=int, default=3024)
+
+    def handle(self, *args, **options):
+        if options['source']:
+            uploads = []
+            for name in sorted(os.listdir(options['source'])):
+                with open(os.path.join(options['source'], name), 'rb') as f:
+                    uploads.append(f.read())
+        else:
+            uploads = [
+                phone_photo(options['width'], options['height'], seed)
+                for seed in range(options['photos'])
+            ]
+        if not uploads:
+            self.stderr.write('No images to measure')
+            return
+
+        args = (ingest.max_size(), ingest.image_format(), ingest.quality())
+        start = time.perf_counter()
+        if ingest.workers():
+            futures = [
+                ingest.pool().submit(ingest.reencode, data, *args)
+                for data in uploads
+            ]
+            compact = [future.result() for future in futures]
+        else:
+            compact = [ingest.reencode(data, *args) for data in uploads]
+        elapsed = time.perf_counter() - start
+
+        before = sum(map(len, uploads)) / len(uploads) * POSTS_PER_PAGE
+        after = sum(map(len, compact)) / len(compact) * POSTS_PER_PAGE
+        self.stdout.write(
+            f'{len(uploads)} images, {ingest.workers()} workers, '
+            f'{elapsed / len(uploads) * 1000:.0f} ms per image'
+        )
+        self.stdout.write(
+            f'Bytes per feed page of {POSTS_PER_PAGE}: '
+            f'{before / 1024:.0f} KiB before, {after / 1024:.0f} KiB after '
+            f'({after / before:.1%})'
+        )
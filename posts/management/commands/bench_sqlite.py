@@ -0,0 +1,141 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+
+from posts.models import Comment, Post
+from posts.paginator import POSTS_PER_PAGE
+
+USER = get_user_model()
+# Django's defaults: rollback journal and a connection per request.
+PLAIN = {'CONN_MAX_AGE': 0, 'PRAGMAS': {'journal_mode': 'DELETE'}}
+
+
+def read(alias):
+    """A feed page, as the index view reads it"""
+    list(Post.objects.using(alias).for_feed().order_by(
+        '-pub_date', '-pk'
+    )[:POSTS_PER_PAGE])
+
+
+def write(alias, author_id):
+    """A new post with a comment, no signals"""
+    posts = Post.objects.using(alias)
+    posts.bulk_create([Post(text='Тестовый текст', author_id=author_id)])
+    post_id = posts.filter(author=author_id).order_by('-pk').values_list(
+        'pk', flat=True
+    ).first()
+    Comment.objects.using(alias).bulk_create(
+        [Comment(post_id=post_id, author_id=author_id, text='Комментарий')]
+    )
+
+
+def worker(alias, operation, args, deadline, counts):
+    """Runs the operation in a loop, each call as a request would"""
+    connection = connections[alias]
+    while time.monotonic() < deadline:
+        try:
+            operation(alias, *args)
+            counts[operation.__name__] += 1
+        except OperationalError:
+            counts['errors'] += 1
+        # Request end: with CONN_MAX_AGE 0 the connection is closed.
+        connection.close_if_unusable_or_obsolete()
+    connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Compares concurrent read and write throughput of SQLite profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument(
+            '--seconds', type=float, default=5, help='Duration of each run'
+        )
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError('The default database is not SQLite')
+        author_id = USER.objects.values_list('pk', flat=True).first()
+        if author_id is None:
+            raise CommandError('No users to write as, run manage.py seed')
+
+        directory = tempfile.mkdtemp()
+        try:
+            results = {}
+            for name, profile in (
+                ('plain', PLAIN),
+                ('production', settings.SQLITE_PRODUCTION),
+            ):
+                results[name] = self.run(
+                    directory, name, profile, author_id, options
+                )
+        finally:
+            shutil.rmtree(directory)
+
+        for name, counts in results.items():
+            self.stdout.write(
+                f'{name:<11} {counts["read"] / options["seconds"]:>8.1f} '
+                f'reads/s  {counts["write"] / options["seconds"]:>7.1f} '
+                f'writes/s  {counts["errors"]} lock errors'
+            )
+        plain, production = results['plain'], results['production']
+        for kind in ('read', 'write'):
+            if plain[kind]:
+                self.stdout.write(
+                    f'{kind}s: x{production[kind] / plain[kind]:.2f}'
+                )
+
+    def run(self, directory, name, profile, author_id, options):
+        """Readers and writers on a copy of the database with the profile"""
+
+        path = os.path.join(directory, f'{name}.sqlite3')
+        target = sqlite3.connect(path)
+        try:
+            connections[DEFAULT_DB_ALIAS].ensure_connection()
+            connections[DEFAULT_DB_ALIAS].connection.backup(target)
+        finally:
+            target.close()
+
+        alias = f'bench_{name}'
+        connections.databases[alias] = {
+            **connections.databases[DEFAULT_DB_ALIAS],
+            **profile,
+            'NAME': path,
+        }
+        deadline = time.monotonic() + options['seconds']
+        counts = [Counter() for _ in range(
+            options['readers'] + options['writers']
+        )]
+        threads = [
+            threading.Thread(
+                target=worker,
+                args=(alias, read, (), deadline, counts[index])
+            )
+            for index in range(options['readers'])
+        ] + [
+            threading.Thread(
+                target=worker,
+                args=(alias, write, (author_id,), deadline,
+                      counts[options['readers'] + index])
+            )
+            for index in range(options['writers'])
+        ]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            del connections.databases[alias]
+        return sum(counts, Counter())
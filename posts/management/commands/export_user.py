@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+
+USER = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Streams a user's posts and comments as JSONL or CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument(
+            '--format', choices=export.FORMATS, default='jsonl'
+        )
+        parser.add_argument(
+            '--output', help='File to write to instead of stdout'
+        )
+
+    def handle(self, *args, **options):
+        user_id = USER.objects.filter(
+            username=options['username']
+        ).values_list('id', flat=True).first()
+        if user_id is None:
+            raise CommandError(f'No user {options["username"]}')
+
+        lines = export.lines(user_id, options['format'])
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8',
+                  newline='') as output:
+            output.writelines(lines)
+        self.stderr.write(f'Exported to {options["output"]}')
@@ -0,0 +1,75 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from posts.models import Follow, Post, UserStats
+
+USER = get_user_model()
+FIELDS = ('posts_count', 'followers_count', 'following_count')
+
+
+class Command(BaseCommand):
+    help = 'Recomputes per-user counters and repairs the drifted ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Users processed per transaction'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report how many rows drifted'
+        )
+
+    def handle(self, *args, **options):
+        counts = {
+            'posts_count': dict(
+                Post.objects.values_list('author').annotate(Count('id'))
+            ),
+            'followers_count': dict(
+                Follow.objects.values_list('author').annotate(Count('id'))
+            ),
+            'following_count': dict(
+                Follow.objects.values_list('user').annotate(Count('id'))
+            ),
+        }
+        batch_size = options['batch_size']
+        user_ids = USER.objects.order_by('pk').values_list('pk', flat=True)
+        created = updated = 0
+        batch = []
+        for user_id in user_ids.iterator(chunk_size=batch_size):
+            batch.append(user_id)
+            if len(batch) == batch_size:
+                c, u = self.repair(batch, counts, options['dry_run'])
+                created, updated = created + c, updated + u
+                batch = []
+        if batch:
+            c, u = self.repair(batch, counts, options['dry_run'])
+            created, updated = created + c, updated + u
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {created}, repaired {updated} stats rows'
+        ))
+
+    def repair(self, user_ids, counts, dry_run):
+        existing = UserStats.objects.in_bulk(user_ids)
+        to_create, to_update = [], []
+        for user_id in user_ids:
+            values = {
+                field: counts[field].get(user_id, 0) for field in FIELDS
+            }
+            stats = existing.get(user_id)
+            if stats is None:
+                to_create.append(UserStats(user_id=user_id, **values))
+            elif any(getattr(stats, f) != v for f, v in values.items()):
+                for field, value in values.items():
+                    setattr(stats, field, value)
+                to_update.append(stats)
+        if not dry_run:
+            with transaction.atomic():
+                UserStats.objects.bulk_create(
+                    to_create, ignore_conflicts=True
+                )
+                UserStats.objects.bulk_update(to_update, FIELDS)
+        return len(to_create), len(to_update)
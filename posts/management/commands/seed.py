@@ -0,0 +1,235 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from mixer.main import Mixer
+
+from posts import search, timeline
+from posts.models import Comment, Follow, Group, Post, Timeline
+
+USER = get_user_model()
+# Texts are stitched from a pool of generated sentences: Faker is too
+# slow to write a million posts one by one.
+SENTENCES = 2000
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Lets bulk_create keep the dates set on auto_now_add fields"""
+
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def insert(model, objects, batch_size):
+    """bulk_create of a generator, a batch at a time; returns the count"""
+
+    objects = iter(objects)
+    count = 0
+    while True:
+        batch = list(islice(objects, batch_size))
+        if not batch:
+            return count
+        model.objects.bulk_create(batch, ignore_conflicts=True)
+        count += len(batch)
+
+
+class Command(BaseCommand):
+    help = 'Fills the database with generated users, posts and follows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=40000)
+        parser.add_argument('--follows', type=int, default=10000)
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='Posts are spread over this many last days'
+        )
+        parser.add_argument(
+            '--password',
+            help='Password of the generated users, unusable by default'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--seed', type=int, default=0, help='Seed of the generator'
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.faker = Mixer(locale='ru').faker
+        self.faker.seed_instance(options['seed'])
+        self.sentences = [self.faker.sentence() for _ in range(SENTENCES)]
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.start = self.now - timedelta(days=options['days'])
+
+        with transaction.atomic():
+            users = self.create_users(
+                options['users'], make_password(options['password'])
+            )
+            groups = self.create_groups(options['groups'])
+        # Heavy-tailed activity: a few authors write and attract most.
+        weights = [self.random.paretovariate(1.2) for _ in users]
+        with transaction.atomic():
+            posts = self.create_posts(
+                options['posts'], users, weights, groups
+            )
+        with transaction.atomic():
+            comments = self.create_comments(options['comments'], users, posts)
+        with transaction.atomic():
+            follows = self.create_follows(options['follows'], users, weights)
+        self.stdout.write(
+            f'Created {len(users)} users, {len(groups)} groups, '
+            f'{len(posts)} posts, {comments} comments, '
+            f'{len(follows)} follows'
+        )
+
+        # bulk_create sends no signals, so everything they keep up to
+        # date is rebuilt here. Versions restart from the clock after
+        # clear(), so no stale fragment or page is served.
+        cache.clear()
+        call_command('repair_stats', stdout=self.stdout)
+        search.rebuild()
+        with transaction.atomic():
+            entries = self.fill_timelines(follows)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt stats, search index and {entries} timeline entries'
+        ))
+
+    def text(self, low, high):
+        count = self.random.randint(low, high)
+        return ' '.join(self.random.choices(self.sentences, k=count))
+
+    def date(self, start=None):
+        start = start or self.start
+        return start + (self.now - start) * self.random.random()
+
+    def create_users(self, count, password):
+        last = USER.objects.order_by('-pk').values_list('pk', flat=True)
+        last = last.first() or 0
+        insert(USER, (
+            USER(
+                username=f'{self.faker.user_name()}_{last + i}',
+                first_name=self.faker.first_name(),
+                last_name=self.faker.last_name(),
+                password=password,
+                date_joined=self.start,
+            )
+            for i in range(1, count + 1)
+        ), self.batch_size)
+        return list(
+            USER.objects.filter(pk__gt=last).values_list('pk', flat=True)
+        )
+
+    def create_groups(self, count):
+        last = Group.objects.order_by('-pk').values_list('pk', flat=True)
+        last = last.first() or 0
+        insert(Group, (
+            Group(
+                title=f'{self.faker.word().capitalize()} {last + i}',
+                slug=f'group-{last + i}',
+                description=self.text(1, 3),
+            )
+            for i in range(1, count + 1)
+        ), self.batch_size)
+        return list(
+            Group.objects.filter(pk__gt=last).values_list('pk', flat=True)
+        )
+
+    def create_posts(self, count, users, weights, groups):
+        last = Post.objects.order_by('-pk').values_list('pk', flat=True)
+        last = last.first() or 0
+        authors = self.random.choices(users, weights, k=count)
+        with explicit_dates(Post._meta.get_field('pub_date')):
+            insert(Post, (
+                Post(
+                    text=self.text(1, 8),
+                    author_id=author,
+                    group_id=(
+                        self.random.choice(groups)
+                        if groups and self.random.random() < 0.7 else None
+                    ),
+                    pub_date=self.date(),
+                )
+                for author in authors
+            ), self.batch_size)
+        return list(
+            Post.objects.filter(pk__gt=last).values_list('pk', 'pub_date')
+        )
+
+    def create_comments(self, count, users, posts):
+        if not posts:
+            return 0
+        with explicit_dates(Comment._meta.get_field('created')):
+            return insert(Comment, (
+                Comment(
+                    post_id=post_id,
+                    author_id=self.random.choice(users),
+                    text=self.text(1, 2),
+                    created=self.date(pub_date),
+                )
+                for post_id, pub_date in self.random.choices(posts, k=count)
+            ), self.batch_size)
+
+    def create_follows(self, count, users, weights):
+        edges = set()
+        # Bounded, as a small graph may not have that many distinct edges.
+        for _ in range(count * 3):
+            if len(edges) == count or len(users) < 2:
+                break
+            user = self.random.choice(users)
+            author = self.random.choices(users, weights)[0]
+            if user != author:
+                edges.add((user, author))
+        insert(Follow, (
+            Follow(user_id=user, author_id=author) for user, author in edges
+        ), self.batch_size)
+        return edges
+
+    def fill_timelines(self, follows):
+        """Timelines of the new follows, as backfill() would leave them"""
+
+        followers = {}
+        for user, author in follows:
+            followers.setdefault(author, []).append(user)
+        pull = timeline.pull_authors()
+        count = 0
+        for author, users in followers.items():
+            if author in pull:
+                continue
+            posts = list(Post.objects.filter(
+                author=author
+            ).order_by('-pub_date', '-pk').values_list(
+                'pk', 'pub_date'
+            )[:timeline.backfill_limit() + 1])
+            if len(posts) > timeline.backfill_limit():
+                posts = posts[:timeline.backfill_limit()]
+                Follow.objects.filter(author=author, user__in=users).update(
+                    backfilled_from=posts[-1][1]
+                )
+            count += insert(Timeline, (
+                Timeline(
+                    user_id=user,
+                    post_id=post_id,
+                    author_id=author,
+                    pub_date=pub_date
+                )
+                for user in users
+                for post_id, pub_date in posts
+            ), self.batch_size)
+        return count
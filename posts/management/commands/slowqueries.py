@@ -0,0 +1,43 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from yatube import slowqueries
+
+
+class Command(BaseCommand):
+    help = 'Summarizes the slow-query log by query shape'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--log', default=getattr(settings, 'SLOW_QUERY_LOG', None),
+            help='Log file, its rotated copies are read too'
+        )
+        parser.add_argument(
+            '--top', type=int, default=10, help='Shapes to show'
+        )
+        parser.add_argument(
+            '--json', action='store_true', help='Print the report as JSON'
+        )
+
+    def handle(self, *args, **options):
+        backups = getattr(settings, 'SLOW_QUERY_LOG_BACKUPS', 5)
+        report = slowqueries.aggregate(
+            slowqueries.read_log(options['log'], backups)
+        )[:options['top']]
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2, ensure_ascii=False))
+            return
+        if not report:
+            self.stdout.write('No slow queries logged')
+            return
+        for found in report:
+            self.stdout.write(self.style.WARNING(
+                f'{found["count"]} x, {found["total_ms"]:.1f} ms total, '
+                f'p95 {found["p95_ms"]:.1f} ms, max {found["max_ms"]:.1f} ms '
+                f'in {", ".join(found["views"])}'
+            ))
+            self.stdout.write(f'  {found["shape"]}')
+            for line in found['plan'] or []:
+                self.stdout.write(f'    {line}')
@@ -0,0 +1,51 @@
+from django.db import migrations
+from django.db.models import Count
+
+from posts.timeline import backfill_limit, fanout_limit
+
+
+def fill_timeline(apps, schema_editor):
+    """Latest posts of followed authors, as timeline.backfill copies them
+
+    Authors with more followers than the fan-out limit are read in pull
+    mode and skipped; follows missing older posts are marked in 0025.
+    """
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    Timeline = apps.get_model('posts', 'Timeline')
+    pull_authors = set(
+        Follow.objects.values('author')
+        .annotate(followers=Count('id'))
+        .filter(followers__gt=fanout_limit())
+        .values_list('author', flat=True)
+    )
+    for follow in Follow.objects.exclude(
+        author__in=pull_authors
+    ).iterator():
+        Timeline.objects.bulk_create(
+            [
+                Timeline(
+                    user_id=follow.user_id,
+                    post_id=post_id,
+                    author_id=follow.author_id,
+                    pub_date=pub_date
+                )
+                for post_id, pub_date in Post.objects.filter(
+                    author=follow.author_id
+                ).order_by('-pub_date', '-pk').values_list(
+                    'pk', 'pub_date'
+                )[:backfill_limit()]
+            ],
+            ignore_conflicts=True
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_timeline'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_timeline, migrations.RunPython.noop),
+    ]
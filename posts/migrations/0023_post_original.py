@@ -0,0 +1,18 @@
+# Generated by Django 2.2.6 on 2026-10-18 18:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0022_comment_related_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='original',
+            field=models.FileField(blank=True, editable=False, null=True, upload_to='posts/originals/', verbose_name='Исходная пикча'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0023_post_original'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            [
+                'CREATE VIRTUAL TABLE posts_post_fts USING fts5('
+                'text, tokenize="unicode61 remove_diacritics 2")',
+                'INSERT INTO posts_post_fts (rowid, text) '
+                "SELECT id, replace(replace(text, 'ё', 'е'), 'Ё', 'Е') "
+                'FROM posts_post',
+            ],
+            'DROP TABLE posts_post_fts',
+        ),
+    ]
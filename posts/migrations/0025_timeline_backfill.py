@@ -0,0 +1,43 @@
+# Generated by Django 2.2.6 on 2026-10-18 19:10
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def mark_truncated(apps, schema_editor):
+    """Follows whose timeline lacks older posts of the author"""
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    Timeline = apps.get_model('posts', 'Timeline')
+    posts = dict(Post.objects.values_list('author').annotate(Count('id')))
+    for follow in Follow.objects.all().iterator():
+        copied = Timeline.objects.filter(
+            user=follow.user_id, author=follow.author_id
+        ).aggregate(count=Count('id'), oldest=Min('pub_date'))
+        if copied['count'] and copied['count'] < posts[follow.author_id]:
+            follow.backfilled_from = copied['oldest']
+            follow.save(update_fields=['backfilled_from'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0024_post_search'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='timeline',
+            name='timeline_user_pub_date_idx',
+        ),
+        migrations.AddField(
+            model_name='follow',
+            name='backfilled_from',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Лента заполнена с'),
+        ),
+        migrations.AddIndex(
+            model_name='timeline',
+            index=models.Index(fields=['user', '-pub_date', '-post'], name='timeline_user_pub_date_idx'),
+        ),
+        migrations.RunPython(mark_truncated, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
 
 
@@ -28,6 +30,25 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Posts with everything post_item.html needs in one query
+
+        Comments are counted in a correlated subquery rather than a JOIN
+        with GROUP BY, so the feed ORDER BY still walks its index.
+        """
+        comments = Comment.objects.filter(
+            post=OuterRef('pk')
+        ).order_by().values('post').annotate(
+            count=Count('pk')
+        ).values('count')
+        return self.select_related('author', 'group').annotate(
+            comments_count=Coalesce(
+                Subquery(comments, output_field=models.IntegerField()), 0
+            )
+        )
+
+
 class Post(models.Model):
     """Post model"""
     text = models.TextField(
@@ -60,10 +81,33 @@ class Post(models.Model):
         null=True,
         help_text='Загрузите изображение'
     )
+    original = models.FileField(
+        verbose_name='Исходная пикча',
+        upload_to='posts/originals/',
+        blank=True,
+        null=True,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Публикация'
         verbose_name_plural = 'Публикации'
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -75,7 +119,7 @@ class Comment(models.Model):
         Post,
         verbose_name='Комментарий',
         on_delete=models.CASCADE,
-        related_name='Post'
+        related_name='comments'
     )
     author = models.ForeignKey(
         USER,
@@ -94,6 +138,12 @@ class Comment(models.Model):
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['post', '-created'],
+                name='comment_post_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:10]
@@ -116,6 +166,84 @@ class Follow(models.Model):
         related_name='following'
     )
 
+    # Older posts of the author are missing from the user's timeline:
+    # the backfill was cut at TIMELINE_BACKFILL_LIMIT or is still due.
+    backfilled_from = models.DateTimeField(
+        'Лента заполнена с',
+        null=True,
+        blank=True
+    )
+
     class Meta:
         verbose_name = 'Подписки'
         verbose_name_plural = 'Подписки'
+        unique_together = ('user', 'author')
+
+
+class Timeline(models.Model):
+    """Materialized follow feed entry, filled on write"""
+
+    user = models.ForeignKey(
+        USER,
+        verbose_name='Читатель',
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        verbose_name='Публикация',
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    author = models.ForeignKey(
+        USER,
+        verbose_name='Автор',
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    pub_date = models.DateTimeField(
+        'Дата публикации'
+    )
+
+    class Meta:
+        verbose_name = 'Лента подписок'
+        verbose_name_plural = 'Ленты подписок'
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx'
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='timeline_user_author_idx'
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    """Denormalized per-user counters, maintained on write"""
+
+    user = models.OneToOneField(
+        USER,
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.PositiveIntegerField(
+        'Записей',
+        default=0
+    )
+    followers_count = models.PositiveIntegerField(
+        'Подписчиков',
+        default=0
+    )
+    following_count = models.PositiveIntegerField(
+        'Подписок',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Статистика'
+        verbose_name_plural = 'Статистика'
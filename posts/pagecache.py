@@ -0,0 +1,104 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from yatube import routers
+
+from . import fragments
+from .models import Group
+
+USER = get_user_model()
+
+
+def index_validators(request):
+    return ['posts']
+
+
+def group_validators(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'id', flat=True
+    ).first()
+    if group_id is None:
+        return None
+    return [f'group:{group_id}']
+
+
+def profile_validators(request, username):
+    user_id = USER.objects.filter(username=username).values_list(
+        'id', flat=True
+    ).first()
+    if user_id is None:
+        return None
+    return [f'author:{user_id}', f'stats:{user_id}']
+
+
+def post_validators(request, username, post_id):
+    user_id = USER.objects.filter(username=username).values_list(
+        'id', flat=True
+    ).first()
+    if user_id is None:
+        return None
+    return [f'author:{user_id}', f'stats:{user_id}']
+
+
+def set_validators(response, etag, timestamp):
+    response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    elif response.has_header('Last-Modified'):
+        del response['Last-Modified']
+    return response
+
+
+def anonymous_page_cache(validators):
+    """Whole-response cache with conditional GET for anonymous readers
+
+    ``validators`` gets the view arguments and returns the content
+    version scopes of the page, or None when the page does not exist. The
+    ETag hashes the full path with those versions, so a matching
+    If-None-Match is answered with 304 before any rendering. Last-Modified
+    is the time the scopes were last bumped, see fragments.last_modified.
+    Pages rendered from a replica are keyed and cached for a short while
+    only, see routers.cache_variant.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ('GET', 'HEAD')
+                    or request.user.is_authenticated):
+                return view(request, *args, **kwargs)
+            found = validators(request, *args, **kwargs)
+            if found is None:
+                return view(request, *args, **kwargs)
+            versions = ':'.join(map(str, (
+                *fragments.versions(*found), *routers.cache_variant()
+            )))
+            etag = '"{}"'.format(hashlib.md5(
+                f'{request.get_full_path()}|{versions}'.encode()
+            ).hexdigest())
+            timestamp = fragments.last_modified(*found)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=timestamp
+            )
+            if response is not None:
+                return set_validators(response, etag, timestamp)
+
+            key = f'page:{etag}'
+            response = cache.get(key)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                cache.set(key, response, routers.cache_timeout(
+                    getattr(settings, 'FEED_CACHE_TIMEOUT', 60 * 60)
+                ))
+            # The date may have settled since the page was cached.
+            return set_validators(response, etag, timestamp)
+        return wrapper
+    return decorator
@@ -0,0 +1,130 @@
+import base64
+
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+POSTS_PER_PAGE = 10
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def make_cursor(direction, pub_date, pk):
+    """Opaque token pointing right after (or before) the given key"""
+    raw = f'{direction}|{pub_date.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def encode_cursor(direction, post, key='pk'):
+    return make_cursor(direction, post.pub_date, getattr(post, key))
+
+
+def decode_cursor(cursor):
+    """Returns (direction, pub_date, pk) or None for a malformed token"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        direction, pub_date, pk = raw.split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except ValueError:
+        return None
+    if direction not in (NEXT, PREVIOUS) or pub_date is None:
+        return None
+    return direction, pub_date, pk
+
+
+class CursorPaginator:
+    """Keyset paginator over (pub_date, id), newest posts first.
+
+    Pages are selected with a range condition on the ordering key instead
+    of OFFSET, and no COUNT(*) is issued. Every page is a standalone
+    ``Page`` of a one-page ``Paginator``, so navigation goes through its
+    ``next_cursor`` and ``previous_cursor`` attributes. ``key`` breaks
+    ties of pub_date; rows that stand for posts, like timeline entries,
+    use the post id so their cursors also work on the posts themselves.
+    """
+
+    def __init__(self, object_list, per_page=POSTS_PER_PAGE, key='pk'):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.key = key
+
+    def get_page(self, cursor=None):
+        decoded = decode_cursor(cursor) if cursor else None
+        if decoded is None:
+            return self._forward(self.object_list, None)
+        direction, pub_date, pk = decoded
+        key = self.key
+        if direction == NEXT:
+            return self._forward(self.object_list.filter(
+                Q(pub_date__lte=pub_date)
+                & ~Q(pub_date=pub_date, **{f'{key}__gte': pk})
+            ), cursor)
+        return self._backward(self.object_list.filter(
+            Q(pub_date__gte=pub_date)
+            & ~Q(pub_date=pub_date, **{f'{key}__lte': pk})
+        ), cursor)
+
+    def _forward(self, queryset, cursor):
+        rows = list(
+            queryset.order_by('-pub_date', f'-{self.key}')[:self.per_page + 1]
+        )
+        has_next = len(rows) > self.per_page
+        return self._page(
+            rows[:self.per_page],
+            cursor,
+            has_previous=cursor is not None,
+            has_next=has_next
+        )
+
+    def _backward(self, queryset, cursor):
+        rows = list(
+            queryset.order_by('pub_date', self.key)[:self.per_page + 1]
+        )
+        if not rows:
+            return self._forward(self.object_list, None)
+        has_previous = len(rows) > self.per_page
+        return self._page(
+            rows[:self.per_page][::-1],
+            cursor,
+            has_previous=has_previous,
+            has_next=True
+        )
+
+    def _page(self, rows, cursor, has_previous, has_next):
+        page = Paginator(rows, self.per_page).page(1)
+        page.cursor = cursor
+        page.next_cursor = (
+            encode_cursor(NEXT, rows[-1], self.key)
+            if rows and has_next else None
+        )
+        page.previous_cursor = (
+            encode_cursor(PREVIOUS, rows[0], self.key)
+            if rows and has_previous else None
+        )
+        return page
+
+
+def paginate(request, queryset, per_page=POSTS_PER_PAGE, key='pk'):
+    """Page of posts for ``?cursor=``, or ``?page=N`` from old links"""
+
+    cursor = request.GET.get('cursor')
+    page_number = request.GET.get('page')
+    if cursor or not page_number:
+        return CursorPaginator(queryset, per_page, key).get_page(cursor)
+
+    paginator = Paginator(
+        queryset.order_by('-pub_date', f'-{key}'), per_page
+    )
+    page = paginator.get_page(page_number)
+    page.cursor = None
+    page.next_cursor = (
+        encode_cursor(NEXT, page[-1], key) if page.has_next() else None
+    )
+    page.previous_cursor = (
+        encode_cursor(PREVIOUS, page[0], key)
+        if page.has_previous() else None
+    )
+    return page
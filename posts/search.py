@@ -0,0 +1,161 @@
+import base64
+import re
+
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+from .paginator import POSTS_PER_PAGE
+
+TABLE = 'posts_post_fts'
+WORD = re.compile(r'\w+')
+CYRILLIC = re.compile('[а-яё]')
+# FTS5 has no Russian stemmer: inflectional endings are cut off and the
+# rest is matched as a prefix, so "кошками" finds "кошка" and "кошки".
+# Forms with a fleeting vowel ("кошек", "ветер") are matched by variants().
+ENDINGS = sorted((
+    'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'иях', 'ией',
+    'ах', 'ях', 'ам', 'ям', 'ом', 'ем', 'ой', 'ей', 'ий', 'ый', 'ая', 'яя',
+    'ое', 'ее', 'ую', 'юю', 'ов', 'ев', 'ми', 'ию', 'ия', 'ие',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True)
+MIN_STEM = 3
+CONSONANTS = frozenset('бвгджзклмнпрстфхцчшщ')
+FLEETING = 'ео'
+
+
+# unicode61 folds case but not ё into е, so both sides are normalized.
+INDEXED_TEXT = "replace(replace(text, 'ё', 'е'), 'Ё', 'Е')"
+
+
+def normalize(text):
+    return text.replace('ё', 'е').replace('Ё', 'Е')
+
+
+def stem(word):
+    word = normalize(word.lower())
+    if not CYRILLIC.search(word):
+        return word
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def variants(term):
+    """The stem and its forms with the fleeting vowel dropped or put back
+
+    "кошек" also gives "кошк", and "кошк" also gives "кошек" and "кошок".
+    """
+
+    forms = [term]
+    if len(term) < MIN_STEM or not CYRILLIC.search(term):
+        return forms
+    *_, before, middle, last = term
+    if last not in CONSONANTS:
+        return forms
+    if middle in FLEETING and before in CONSONANTS:
+        if len(term) - 1 >= MIN_STEM:
+            forms.append(term[:-2] + last)
+    elif middle in CONSONANTS:
+        forms.extend(term[:-1] + vowel + last for vowel in FLEETING)
+    return forms
+
+
+def match_expression(query):
+    """FTS5 query matching posts with every word of the query, or None"""
+    groups = []
+    for word in WORD.findall(query):
+        forms = ' OR '.join(f'"{form}"*' for form in variants(stem(word)))
+        groups.append(f'({forms})')
+    return ' AND '.join(groups) or None
+
+
+def index_post(post, created=False):
+    with connection.cursor() as cursor:
+        if not created:
+            cursor.execute(
+                f'DELETE FROM {TABLE} WHERE rowid = %s', [post.pk]
+            )
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text) VALUES (%s, %s)',
+            [post.pk, normalize(post.text)]
+        )
+
+
+def unindex_post(post_id):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post_id])
+
+
+def rebuild():
+    """Indexes every post again, after writes that bypassed the signals"""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text) '
+            f'SELECT id, {INDEXED_TEXT} FROM posts_post'
+        )
+
+
+def filter_matching(queryset, query):
+    """Posts of the queryset that match the query, in any order"""
+    expression = match_expression(query)
+    if expression is None:
+        return queryset.none()
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s', [expression]
+    ))
+
+
+def encode_cursor(rank, pk):
+    raw = f'{rank!r}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Returns (rank, pk) or None for a malformed token"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        rank, pk = raw.split('|')
+        return float(rank), int(pk)
+    except ValueError:
+        return None
+
+
+def search_page(query, cursor=None, per_page=POSTS_PER_PAGE):
+    """Page of posts matching the query, best BM25 rank first
+
+    Pages continue after the (rank, rowid) of the last result instead of
+    using OFFSET. Only forward navigation is offered.
+    """
+
+    expression = match_expression(query)
+    rows = []
+    if expression is not None:
+        sql = f'SELECT rowid, rank FROM {TABLE} WHERE {TABLE} MATCH %s'
+        params = [expression]
+        after = decode_cursor(cursor) if cursor else None
+        if after is not None:
+            sql += ' AND (rank > %s OR (rank = %s AND rowid > %s))'
+            params += [after[0], after[0], after[1]]
+        sql += ' ORDER BY rank, rowid LIMIT %s'
+        params.append(per_page + 1)
+        with connection.cursor() as db_cursor:
+            db_cursor.execute(sql, params)
+            rows = db_cursor.fetchall()
+
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    posts = Post.objects.for_feed().in_bulk([pk for pk, _ in rows])
+    page = Paginator(
+        [posts[pk] for pk, _ in rows if pk in posts], per_page
+    ).page(1)
+    page.cursor = cursor
+    page.next_cursor = (
+        encode_cursor(rows[-1][1], rows[-1][0]) if has_next else None
+    )
+    page.previous_cursor = None
+    return page
@@ -0,0 +1,134 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import autocomplete, fragments, search, stats, thumbnails, timeline
+from .models import Comment, Follow, Group, Post
+
+USER = get_user_model()
+NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, **kwargs):
+    if instance._state.adding:
+        return
+    old_group = Post.objects.filter(
+        pk=instance.pk
+    ).values_list('group', flat=True).first()
+    if old_group != instance.group_id:
+        fragments.bump_on_commit(f'group:{old_group}')
+
+
+@receiver(post_save, sender=Post)
+def post_published(sender, instance, created, **kwargs):
+    fragments.bump_on_commit(*fragments.post_scopes(instance))
+    thumbnails.schedule(instance)
+    search.index_post(instance, created)
+    if created:
+        stats.bump(instance.author_id, 'posts_count', 1)
+        timeline.fan_out(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    fragments.bump_on_commit(*fragments.post_scopes(instance))
+    search.unindex_post(instance.pk)
+    stats.bump(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_added(sender, instance, **kwargs):
+    fragments.bump_on_commit(*fragments.post_scopes(instance.post))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    # Comments deleted along with their post leave it to post_deleted.
+    post = Post.objects.filter(pk=instance.post_id).first()
+    if post is not None:
+        fragments.bump_on_commit(*fragments.post_scopes(post))
+
+
+@receiver(post_save, sender=Follow)
+def author_followed(sender, instance, created, **kwargs):
+    fragments.bump_on_commit(
+        f'follow:{instance.user_id}',
+        f'stats:{instance.user_id}',
+        f'stats:{instance.author_id}'
+    )
+    if created:
+        stats.bump(instance.author_id, 'followers_count', 1)
+        stats.bump(instance.user_id, 'following_count', 1)
+        timeline.on_follow(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def author_unfollowed(sender, instance, **kwargs):
+    fragments.bump_on_commit(
+        f'follow:{instance.user_id}',
+        f'stats:{instance.user_id}',
+        f'stats:{instance.author_id}'
+    )
+    stats.bump(instance.author_id, 'followers_count', -1)
+    stats.bump(instance.user_id, 'following_count', -1)
+    timeline.on_unfollow(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=USER)
+def user_saved(sender, instance, created, **kwargs):
+    if created:
+        fragments.bump_on_commit(autocomplete.USERS_SCOPE)
+
+
+@receiver(pre_save, sender=USER)
+def user_changing(sender, instance, update_fields=None, **kwargs):
+    """Posts show their author's username and name wherever listed"""
+    if instance._state.adding or (
+        update_fields is not None and set(NAME_FIELDS).isdisjoint(
+            update_fields
+        )
+    ):
+        return
+    old_names = USER.objects.filter(
+        pk=instance.pk
+    ).values_list(*NAME_FIELDS).first()
+    names = tuple(getattr(instance, field) for field in NAME_FIELDS)
+    if old_names is None or old_names == names:
+        return
+    groups = Post.objects.filter(
+        author=instance.pk, group__isnull=False
+    ).values_list('group', flat=True).distinct()
+    fragments.bump_on_commit(
+        f'author:{instance.pk}', 'posts',
+        *(f'group:{group_id}' for group_id in groups)
+    )
+    if old_names[0] != instance.username:
+        fragments.bump_on_commit(autocomplete.RELOAD_SCOPE)
+
+
+@receiver(post_delete, sender=USER)
+def user_deleted(sender, instance, **kwargs):
+    fragments.bump_on_commit(autocomplete.RELOAD_SCOPE)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    fragments.bump_on_commit(autocomplete.GROUPS_SCOPE)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def group_edited(sender, instance, created=False, **kwargs):
+    """Cards show the group title wherever its posts are listed"""
+    if created:
+        return
+    authors = Post.objects.filter(group=instance.pk).values_list(
+        'author', flat=True
+    ).distinct()
+    fragments.bump_on_commit(
+        f'group:{instance.pk}', 'posts',
+        *(f'author:{author_id}' for author_id in authors)
+    )
@@ -0,0 +1,49 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Follow, Post, UserStats
+
+USER = get_user_model()
+
+
+def _count(queryset, field):
+    """COUNT(*) of the rows with the outer user in the field, as a
+    subquery"""
+
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(count=Count('*')).values('count')
+    ), 0)
+
+
+def count_stats(user_id):
+    """Counters computed from scratch, in one query"""
+
+    return USER.objects.filter(pk=user_id).values(
+        posts_count=_count(Post.objects.all(), 'author'),
+        followers_count=_count(Follow.objects.all(), 'author'),
+        following_count=_count(Follow.objects.all(), 'user'),
+    ).get()
+
+
+def get_stats(user):
+    """Counters of a user; the row is created on first read"""
+
+    try:
+        return UserStats.objects.get(user=user)
+    except UserStats.DoesNotExist:
+        # A concurrent first read inserts the same counts.
+        stats = UserStats(user=user, **count_stats(user.id))
+        UserStats.objects.bulk_create([stats], ignore_conflicts=True)
+        return stats
+
+
+def bump(user_id, field, delta):
+    """Atomically shifts a counter; missing rows are left to get_stats"""
+
+    rows = UserStats.objects.filter(user=user_id)
+    if delta < 0:
+        rows = rows.filter(**{f'{field}__gte': -delta})
+    rows.update(**{field: F(field) + delta})
@@ -0,0 +1,13 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def card_image(context, post):
+    cards = context.get('cards')
+    if cards is not None and post.pk in cards:
+        return cards[post.pk]
+    return thumbnails.card(post.image)
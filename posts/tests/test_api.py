@@ -0,0 +1,140 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Comment, Group, Post
+from posts.stats import get_stats
+from yatube.querycount import QueryBudgetMixin
+
+USER = get_user_model()
+
+
+class ApiTest(QueryBudgetMixin, TestCase):
+    """Тестирование JSON API"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = USER.objects.create_user(
+            username='TestUser', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Название группы',
+            slug='test',
+            description='Описание группы',
+        )
+        for i in range(12):
+            cls.post = Post.objects.create(
+                text=f'Тестовый текст {i}',
+                group=cls.group if i % 2 else None,
+                author=cls.user,
+            )
+        for i in range(3):
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Комментарий {i}'
+            )
+        # Счётчики считаются при первом чтении, бюджет — на готовых.
+        get_stats(cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def get(self, name, params=None, **kwargs):
+        return self.client.get(reverse(f'api:{name}', kwargs=kwargs), params)
+
+    def test_post_list_pages(self):
+        """Лента отдаётся страницами по курсору без повторов"""
+        first = self.get('post_list')
+        second = self.client.get(first.json()['next'])
+
+        self.assertWithinQueryBudget(first)
+        self.assertEqual(len(first.json()['results']), 10)
+        self.assertEqual(
+            first.json()['results'][0]['text'], 'Тестовый текст 11'
+        )
+        self.assertEqual(len(second.json()['results']), 2)
+        self.assertIsNone(second.json()['next'])
+        ids = [item['id'] for item in first.json()['results']]
+        ids += [item['id'] for item in second.json()['results']]
+        self.assertEqual(len(set(ids)), 12)
+
+    def test_sparse_fields(self):
+        """?fields= ограничивает набор полей, неизвестные поля — ошибка"""
+        response = self.get('post_list', {'fields': 'id,comments_count'})
+        self.assertEqual(
+            response.json()['results'][0],
+            {'id': self.post.id, 'comments_count': 3}
+        )
+        self.assertEqual(
+            self.get('post_list', {'fields': 'id,password'}).status_code, 400
+        )
+
+    def test_etag_revalidation(self):
+        """Совпавший ETag даёт 304, новая запись меняет ETag"""
+        etag = self.get('post_list')['ETag']
+        response = self.client.get(
+            reverse('api:post_list'), HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
+
+        Post.objects.create(text='Новая запись', author=self.user)
+        response = self.client.get(
+            reverse('api:post_list'), HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_post_and_comments(self):
+        """Запись и её комментарии"""
+        post = self.get('post_detail', post_id=self.post.id)
+        comments = self.get('comment_list', post_id=self.post.id)
+
+        self.assertEqual(post.json()['author'], 'TestUser')
+        self.assertEqual(post.json()['group'], 'test')
+        self.assertEqual(
+            [item['text'] for item in comments.json()['results']],
+            ['Комментарий 2', 'Комментарий 1', 'Комментарий 0']
+        )
+        self.assertWithinQueryBudget(post)
+        self.assertWithinQueryBudget(comments)
+        self.assertEqual(
+            self.get('post_detail', post_id=999).status_code, 404
+        )
+
+    def test_group_and_user(self):
+        """Сообщество, профиль и их записи"""
+        group = self.get('group_detail', slug='test')
+        group_posts = self.get('group_post_list', slug='test')
+        user = self.get('user_detail', username='TestUser')
+        user_posts = self.get('user_post_list', username='TestUser')
+
+        self.assertEqual(group.json()['title'], 'Название группы')
+        self.assertEqual(len(group_posts.json()['results']), 6)
+        self.assertEqual(user.json()['name'], 'Лев Толстой')
+        self.assertEqual(user.json()['posts_count'], 12)
+        self.assertEqual(len(user_posts.json()['results']), 10)
+        for response in (group, group_posts, user, user_posts):
+            self.assertWithinQueryBudget(response)
+        self.assertEqual(
+            self.get('user_detail', username='nobody').status_code, 404
+        )
+
+    def test_edits_change_etags(self):
+        """Правка сообщества и имени автора меняет ETag"""
+        group_etag = self.get('group_detail', slug='test')['ETag']
+        user_etag = self.get('user_detail', username='TestUser')['ETag']
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.user.first_name = 'Николай'
+        self.user.save()
+
+        group = self.client.get(
+            reverse('api:group_detail', kwargs={'slug': 'test'}),
+            HTTP_IF_NONE_MATCH=group_etag
+        )
+        user = self.client.get(
+            reverse('api:user_detail', kwargs={'username': 'TestUser'}),
+            HTTP_IF_NONE_MATCH=user_etag
+        )
+        self.assertEqual(group.json()['title'], 'Новое название')
+        self.assertEqual(user.json()['name'], 'Николай Толстой')
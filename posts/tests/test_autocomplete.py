@@ -0,0 +1,170 @@
+import random
+import string
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import (
+    Client, SimpleTestCase, TransactionTestCase, override_settings
+)
+from django.urls import reverse
+from posts import autocomplete
+from posts.autocomplete import PrefixIndex
+from posts.models import Group
+from yatube.querycount import QueryBudgetMixin
+
+USER = get_user_model()
+
+
+@override_settings(AUTOCOMPLETE_SYNC_INTERVAL=0)
+class AutocompleteTest(QueryBudgetMixin, TransactionTestCase):
+    """Тестирование подсказок по авторам и сообществам"""
+
+    def setUp(self):
+        USER.objects.create_user(username='leo')
+        USER.objects.create_user(username='Leonid')
+        USER.objects.create_user(username='anna')
+        Group.objects.create(
+            title='Лев Толстой', slug='tolstoy', description='Описание'
+        )
+        cache.clear()
+        self.client = Client()
+
+    def tearDown(self):
+        # No build may read the tables while the next test flushes them.
+        autocomplete.index.join()
+
+    def labels(self, query):
+        """Подсказки после перестройки индекса, если она нужна"""
+        autocomplete.index.lookup(query)
+        autocomplete.index.join()
+        return [item['label'] for item in autocomplete.index.lookup(query)]
+
+    def test_prefix_lookup(self):
+        """Подсказки ищутся по началу имени без учёта регистра"""
+        self.assertEqual(self.labels('le'), ['leo', 'Leonid'])
+        self.assertEqual(self.labels('ЛЕВ'), ['Лев Толстой'])
+        self.assertEqual(self.labels('tol'), ['Лев Толстой'])
+        self.assertEqual(self.labels('x'), [])
+
+    def test_new_users_and_groups_are_picked_up(self):
+        """Новые записи попадают в индекс без полной перестройки"""
+        self.labels('le')
+        USER.objects.create_user(username='lev')
+        Group.objects.create(title='Лето', slug='leto', description='')
+
+        self.assertEqual(self.labels('le'), ['leo', 'Leonid', 'Лето', 'lev'])
+        USER.objects.get(username='leo').delete()
+        self.assertEqual(self.labels('leo'), ['Leonid'])
+
+    def test_renamed_users_are_picked_up(self):
+        """Переименованный автор ищется по новому имени"""
+        self.labels('le')
+        user = USER.objects.get(username='leo')
+        user.username = 'lion'
+        user.save()
+
+        self.assertEqual(self.labels('le'), ['Leonid'])
+        self.assertEqual(self.labels('li'), ['lion'])
+
+    def test_lookups_do_not_wait_for_build(self):
+        """Пока индекс строится, подсказки читаются из базы"""
+        index = autocomplete.Autocomplete()
+        release = threading.Event()
+        build = index._build
+        with mock.patch.object(
+            index, '_build', side_effect=lambda: release.wait() or build()
+        ):
+            index.warm()
+            items = index.lookup('le')
+        release.set()
+        index.join()
+
+        self.assertEqual(
+            [item['label'] for item in items], ['leo', 'Leonid']
+        )
+        self.assertEqual(
+            [item['label'] for item in index.lookup('le')], ['leo', 'Leonid']
+        )
+
+    def test_version_checks_are_throttled(self):
+        """Версии проверяются не чаще раза в заданный интервал"""
+        self.labels('le')
+        USER.objects.create_user(username='lev')
+        with override_settings(AUTOCOMPLETE_SYNC_INTERVAL=60):
+            with mock.patch.object(
+                autocomplete.fragments, 'versions'
+            ) as versions:
+                self.assertEqual(self.labels('le'), ['leo', 'Leonid'])
+
+        versions.assert_not_called()
+        self.assertEqual(self.labels('le'), ['leo', 'Leonid', 'lev'])
+
+    def test_lookups_do_not_wait_for_sync(self):
+        """Пока новые записи читаются, подсказки идут по прежнему индексу"""
+        self.labels('le')
+        USER.objects.create_user(username='lev')
+        reading, release = threading.Event(), threading.Event()
+        entries = autocomplete.user_entries
+
+        def slow_entries(queryset):
+            reading.set()
+            release.wait()
+            yield from entries(queryset)
+
+        def lookup():
+            try:
+                autocomplete.index.lookup('le')
+            finally:
+                connection.close()
+
+        with mock.patch.object(
+            autocomplete, 'user_entries', side_effect=slow_entries
+        ):
+            sync = threading.Thread(target=lookup)
+            sync.start()
+            reading.wait()
+            with override_settings(AUTOCOMPLETE_SYNC_INTERVAL=60):
+                self.assertEqual(self.labels('le'), ['leo', 'Leonid'])
+            release.set()
+            sync.join()
+
+        self.assertEqual(self.labels('le'), ['leo', 'Leonid', 'lev'])
+
+    def test_view_does_not_query_database(self):
+        """Запрос подсказок не обращается к базе"""
+        self.labels('a')
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('autocomplete'), {'q': 'an'})
+
+        self.assertEqual(response.json(), {'results': [
+            {'type': 'user', 'label': 'anna', 'url': '/anna/'},
+        ]})
+        self.assertWithinQueryBudget(response)
+
+
+class PrefixIndexTest(SimpleTestCase):
+    """Тестирование скорости префиксного индекса"""
+
+    def test_lookup_latency(self):
+        """99% подсказок по миллиону имён быстрее 5 мс"""
+        rng = random.Random(1)
+        names = {
+            ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 12)))
+            for _ in range(1000000)
+        }
+        index = PrefixIndex(
+            (name, ('user', pk, name)) for pk, name in enumerate(names)
+        )
+        timings = []
+        for _ in range(1000):
+            prefix = ''.join(rng.choices(string.ascii_lowercase, k=2))
+            start = time.perf_counter()
+            index.search(prefix, 10)
+            timings.append(time.perf_counter() - start)
+
+        timings.sort()
+        self.assertLess(timings[int(len(timings) * 0.99)], 0.005)
@@ -0,0 +1,63 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from posts import autocomplete, search
+from posts.models import Comment, Follow, Post, Timeline, UserStats
+
+USER = get_user_model()
+
+
+class SeedBenchTest(TestCase):
+    """Тестирование команд seed и bench"""
+    def setUp(self):
+        cache.clear()
+        call_command(
+            'seed', users=20, groups=3, posts=200, comments=100,
+            follows=40, stdout=StringIO()
+        )
+
+    def test_seed_keeps_derived_data(self):
+        """seed заполняет таблицы и всё, что обычно ведут сигналы"""
+        self.assertEqual(USER.objects.count(), 20)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertEqual(Follow.objects.count(), 40)
+        self.assertEqual(UserStats.objects.count(), 20)
+
+        follow = Follow.objects.first()
+        self.assertEqual(
+            Timeline.objects.filter(
+                user=follow.user, author=follow.author
+            ).count(),
+            Post.objects.filter(author=follow.author).count()
+        )
+        word = Post.objects.first().text.split()[0].strip('.,')
+        self.assertTrue(search.search_page(word).object_list)
+
+    def test_bench_writes_results(self):
+        """bench измеряет каждую страницу и сохраняет JSON"""
+        # The index could not be built from another connection while the
+        # test transaction is open; its lookups read the database instead.
+        with tempfile.TemporaryDirectory() as directory, mock.patch.object(
+            autocomplete.index, '_build_later'
+        ):
+            path = os.path.join(directory, 'bench.json')
+            call_command(
+                'bench', requests=3, warmup=1, output=path,
+                stdout=StringIO(), stderr=StringIO()
+            )
+            with open(path) as f:
+                report = json.load(f)
+
+        self.assertEqual(report['rows']['posts'], 200)
+        for name in ('index', 'profile', 'post', 'follow_index'):
+            result = report['results'][name]
+            self.assertEqual(result['statuses'], {'200': 3})
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
@@ -1,7 +1,10 @@
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.db import transaction
+from django.test import Client, TestCase, TransactionTestCase
 from django.urls import reverse
-from posts.models import Post, Group
+from posts import fragments
+from posts.models import Comment, Group, Post
 USER = get_user_model()
 
 
@@ -41,3 +44,101 @@ class CacheCaseTest(TestCase):
         )
 
         self.assertNotContains(response, 'Новый пост')
+
+    def test_new_post_invalidates_index(self):
+        """Новая запись сразу видна на закэшированной главной"""
+        cache.clear()
+        self.guest_client.get(reverse('index'))
+        self.authorized_client.post(
+            reverse('new_post'),
+            data={'text': 'Свежий пост', 'group': self.group.id},
+        )
+
+        response = self.guest_client.get(reverse('index'))
+        self.assertContains(response, 'Свежий пост')
+
+    def test_comment_invalidates_group(self):
+        """Новый комментарий обновляет счётчик на странице группы"""
+        cache.clear()
+        url = reverse('group_posts', kwargs={'slug': 'test'})
+        self.guest_client.get(url)
+        self.authorized_client.post(
+            reverse('add_comment', kwargs={
+                'username': 'TestUser',
+                'post_id': self.post.id,
+            }),
+            data={'text': 'Комментарий'},
+        )
+
+        response = self.guest_client.get(url)
+        self.assertContains(response, 'Комментариев: 1')
+
+    def test_deleted_comment_invalidates_group(self):
+        """Удалённый комментарий пропадает со страницы группы"""
+        cache.clear()
+        comment = Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий'
+        )
+        url = reverse('group_posts', kwargs={'slug': 'test'})
+        self.assertContains(self.guest_client.get(url), 'Комментариев: 1')
+        comment.delete()
+
+        response = self.guest_client.get(url)
+        self.assertNotContains(response, 'Комментариев:')
+
+    def test_renamed_group_invalidates_feeds(self):
+        """Новое название группы видно в закэшированных лентах"""
+        cache.clear()
+        urls = (
+            reverse('index'),
+            reverse('profile', kwargs={'username': 'TestUser'}),
+        )
+        for url in urls:
+            self.authorized_client.get(url)
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Новое название'
+        group.save()
+
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, '#Новое название')
+
+    def test_follow_feed_is_not_served_from_index(self):
+        """Лента подписок не берётся из кэша главной страницы"""
+        cache.clear()
+        self.authorized_client.get(reverse('index'))
+
+        response = self.authorized_client.get(reverse('follow_index'))
+        self.assertNotContains(response, 'Тестовый текст')
+
+
+class BumpOnCommitTest(TransactionTestCase):
+    """Тестирование смены версий кэша после фиксации транзакции"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = USER.objects.create_user(username='TestUser')
+        self.client = Client()
+
+    def test_versions_move_on_commit(self):
+        """До фиксации записи страницы читаются со старыми версиями"""
+        before = fragments.versions('posts')
+        self.client.get(reverse('index'))
+
+        with transaction.atomic():
+            Post.objects.create(text='Новая запись', author=self.user)
+            # Other connections still read the old page here.
+            self.assertEqual(fragments.versions('posts'), before)
+
+        self.assertNotEqual(fragments.versions('posts'), before)
+        self.assertContains(self.client.get(reverse('index')), 'Новая запись')
+
+    def test_rollback_keeps_versions(self):
+        """Откат транзакции не меняет версии"""
+        before = fragments.versions('posts')
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            Post.objects.create(text='Новая запись', author=self.user)
+            raise RuntimeError
+
+        self.assertEqual(fragments.versions('posts'), before)
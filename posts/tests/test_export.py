@@ -0,0 +1,94 @@
+import csv
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Comment, Group, Post
+
+USER = get_user_model()
+
+
+class ExportTest(TestCase):
+    """Тестирование выгрузки записей и комментариев"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = USER.objects.create_user(username='TestUser')
+        cls.other = USER.objects.create_user(username='Other')
+        cls.admin = USER.objects.create_user(
+            username='Admin', is_staff=True
+        )
+        group = Group.objects.create(title='Группа', slug='test')
+        for i in range(5):
+            post = Post.objects.create(
+                text=f'Запись {i}', author=cls.user, group=group
+            )
+        Post.objects.create(text='Чужая запись', author=cls.other)
+        Comment.objects.create(post=post, author=cls.user, text='Мой')
+        Comment.objects.create(post=post, author=cls.other, text='Чужой')
+        cls.url = reverse('export', kwargs={'username': 'TestUser'})
+
+    def client_for(self, user):
+        client = Client()
+        client.force_login(user)
+        return client
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_jsonl_stream(self):
+        """JSONL отдаётся потоком: все записи и комментарии автора"""
+        response = self.client_for(self.user).get(self.url)
+
+        self.assertTrue(response.streaming)
+        rows = [
+            json.loads(line)
+            for line in b''.join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual(
+            [(row['type'], row['text']) for row in rows],
+            [('post', f'Запись {i}') for i in range(5)]
+            + [('comment', 'Мой')]
+        )
+        self.assertEqual(rows[0]['group'], 'test')
+
+    def test_csv_stream(self):
+        """CSV начинается с заголовка и содержит строку на объект"""
+        response = self.client_for(self.user).get(
+            self.url, {'format': 'csv'}
+        )
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(StringIO(content)))
+
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[-1]['type'], 'comment')
+
+    def test_access(self):
+        """Выгрузку получает только сам автор или администратор"""
+        self.assertEqual(
+            self.client_for(self.other).get(self.url).status_code, 403
+        )
+        self.assertEqual(
+            self.client_for(self.admin).get(self.url).status_code, 200
+        )
+        self.assertEqual(
+            self.client_for(self.user).get(
+                self.url, {'format': 'xml'}
+            ).status_code,
+            400
+        )
+        self.assertEqual(Client().get(self.url).status_code, 302)
+
+    def test_command(self):
+        """Команда export_user пишет выгрузку в файл"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'export.jsonl')
+            call_command(
+                'export_user', 'TestUser', output=path, stderr=StringIO()
+            )
+            with open(path, encoding='utf-8') as f:
+                self.assertEqual(len(f.readlines()), 6)
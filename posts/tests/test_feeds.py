@@ -0,0 +1,123 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts import fragments
+from posts.feeds import follow_token
+from posts.models import Follow, Group, Post
+
+USER = get_user_model()
+
+
+class FeedTest(TestCase):
+    """Тестирование RSS и Atom лент"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = USER.objects.create_user(username='TestUser')
+        cls.reader = USER.objects.create_user(
+            username='Reader', password='secret'
+        )
+        cls.group = Group.objects.create(
+            title='Название группы', slug='test', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Запись в группе', author=cls.user, group=cls.group
+        )
+        Post.objects.create(text='Запись без группы', author=cls.reader)
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_group_and_profile_feeds(self):
+        """Ленты сообщества и автора содержат их записи"""
+        rss = self.client.get(reverse('group_rss', args=['test']))
+        atom = self.client.get(reverse('profile_atom', args=['TestUser']))
+
+        self.assertTrue(rss['Content-Type'].startswith('application/rss+xml'))
+        self.assertContains(rss, 'Запись в группе')
+        self.assertNotContains(rss, 'Запись без группы')
+        self.assertTrue(
+            atom['Content-Type'].startswith('application/atom+xml')
+        )
+        self.assertContains(atom, 'Запись в группе')
+        self.assertEqual(
+            self.client.get(reverse('group_rss', args=['nope'])).status_code,
+            404
+        )
+
+    def test_conditional_get(self):
+        """Повторный опрос с валидаторами заканчивается 304"""
+        url = reverse('group_atom', args=['test'])
+        self.client.get(url)
+        later = time.time() + fragments.SETTLE_SECONDS + 1
+        with mock.patch.object(fragments, '_now', return_value=later):
+            response = self.client.get(url)
+            not_modified = self.client.get(
+                url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+            )
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(
+            self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag']
+            ).status_code,
+            304
+        )
+
+        Post.objects.create(
+            text='Новая запись', author=self.user, group=self.group
+        )
+        fresh = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(fresh.status_code, 200)
+        self.assertContains(fresh, 'Новая запись')
+
+    def test_follow_feed_token(self):
+        """Лента подписок открывается по токену, смена пароля его отзывает"""
+        token = follow_token(self.reader)
+        response = self.client.get(reverse('follow_rss', args=[token]))
+
+        self.assertContains(response, 'Запись в группе')
+        self.assertNotContains(response, 'Запись без группы')
+        self.assertEqual(
+            self.client.get(
+                reverse('follow_rss', args=[f'{self.reader.pk}-0'])
+            ).status_code,
+            404
+        )
+
+        reader = USER.objects.get(pk=self.reader.pk)
+        reader.set_password('another')
+        reader.save()
+        self.assertEqual(
+            self.client.get(reverse('follow_atom', args=[token])).status_code,
+            404
+        )
+
+    def test_follow_page_links_feed(self):
+        """Страница подписок ссылается на личную ленту"""
+        self.client.force_login(self.reader)
+        response = self.client.get(reverse('follow_index'))
+        self.assertContains(
+            response, reverse('follow_rss', args=[follow_token(self.reader)])
+        )
+
+    def test_follow_feed_etag_scopes(self):
+        """ETag ленты подписок меняется только с записями избранных
+        авторов"""
+        url = reverse('follow_rss', args=[follow_token(self.reader)])
+        etag = self.client.get(url)['ETag']
+
+        Post.objects.create(text='Чужая запись', author=self.reader)
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+
+        Post.objects.create(text='Новая запись', author=self.user)
+        fresh = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(fresh.status_code, 200)
+        self.assertContains(fresh, 'Новая запись')
@@ -0,0 +1,80 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post
+
+USER = get_user_model()
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite')
+class FeedQueryPlanTest(TestCase):
+    """Проверяем, что запросы лент идут по индексам без сортировки"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = USER.objects.create_user(username='TestUser')
+        cls.author = USER.objects.create_user(username='TestAuthor')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+        cls.group = Group.objects.create(
+            title='Название группы',
+            slug='test',
+            description='Описание группы',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for i in range(12):
+            Post.objects.create(
+                text=f'Тестовый текст {i}',
+                group=cls.group,
+                author=cls.author,
+            )
+        cls.post = Post.objects.first()
+        Comment.objects.create(
+            post=cls.post,
+            author=cls.user,
+            text='Комментарий',
+        )
+
+    def feed_query_plans(self, url):
+        """Планы всех запросов страницы с ORDER BY"""
+        with CaptureQueriesContext(connection) as context:
+            response = self.authorized_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                if 'ORDER BY' not in query['sql']:
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                plans.append(' '.join(row[-1] for row in cursor.fetchall()))
+        return plans
+
+    def test_feed_queries_use_indexes(self):
+        """Ленты читаются по составным индексам"""
+        first_page = self.authorized_client.get(reverse('index'))
+        next_cursor = first_page.context['page'].next_cursor
+        urls = (
+            reverse('index'),
+            reverse('index') + f'?cursor={next_cursor}',
+            reverse('group_posts', kwargs={'slug': 'test'}),
+            reverse('profile', kwargs={'username': 'TestAuthor'}),
+            reverse('profile', kwargs={'username': 'TestAuthor'})
+            + f'?cursor={next_cursor}',
+            reverse('follow_index'),
+            reverse('post', kwargs={
+                'username': 'TestAuthor',
+                'post_id': self.post.id,
+            }),
+        )
+
+        for url in urls:
+            with self.subTest(url=url):
+                plans = self.feed_query_plans(url)
+                self.assertTrue(plans)
+                for plan in plans:
+                    self.assertIn('INDEX', plan)
+                    self.assertNotIn('TEMP B-TREE', plan)
@@ -0,0 +1,132 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from posts import ingest, thumbnails
+from posts.models import Post
+
+from yatube.metrics import registry
+
+USER = get_user_model()
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def photo(size=(400, 200), orientation=None, fmt='JPEG'):
+    image = Image.new('RGB', size, 'red')
+    exif = Image.Exif()
+    exif[0x010F] = 'Phone'
+    if orientation:
+        exif[0x0112] = orientation
+    content = BytesIO()
+    image.save(content, fmt, exif=exif.tobytes())
+    return content.getvalue()
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT, IMAGE_MAX_SIZE=100, IMAGE_INGEST_WORKERS=0
+)
+class IngestTest(TestCase):
+    """Тестирование обработки загруженных картинок"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = USER.objects.create_user(username='TestUser')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        # Thumbnails generated in the background would outlive the test.
+        patcher = mock.patch.object(thumbnails, 'submit')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reencode_bounds_rotates_and_strips(self):
+        """Картинка уменьшается, поворачивается по EXIF и теряет метаданные"""
+        data = ingest.reencode(photo(orientation=6), 100, 'JPEG', 80)
+
+        with Image.open(BytesIO(data)) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (50, 100))
+            self.assertNotIn('exif', image.info)
+
+    def test_transparent_png_to_jpeg(self):
+        """Прозрачность PNG заливается белым при переводе в JPEG"""
+        content = BytesIO()
+        Image.new('RGBA', (10, 10), (0, 0, 0, 0)).save(content, 'PNG')
+        data = ingest.reencode(content.getvalue(), 100, 'JPEG', 80)
+
+        with Image.open(BytesIO(data)) as image:
+            self.assertEqual(image.mode, 'RGB')
+            self.assertEqual(image.getpixel((5, 5)), (255, 255, 255))
+
+    def new_post(self, name='photo.jpg'):
+        self.authorized_client.post(reverse('new_post'), data={
+            'text': 'Тестовый текст',
+            'image': SimpleUploadedFile(name, photo(), 'image/jpeg'),
+        })
+        return Post.objects.get(author=self.user)
+
+    def test_form_stores_compact_image(self):
+        """Форма сохраняет сжатую копию без исходника"""
+        post = self.new_post('photo.png')
+
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        self.assertFalse(post.original)
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (100, 50))
+
+    @override_settings(IMAGE_KEEP_ORIGINALS=True)
+    def test_form_keeps_original(self):
+        """По настройке исходник сохраняется рядом"""
+        post = self.new_post()
+
+        self.assertTrue(post.original.name.startswith('posts/originals/'))
+        self.assertEqual(post.original.read(), photo())
+
+    @override_settings(IMAGE_INGEST_WORKERS=1)
+    def test_process_pool(self):
+        """Пул процессов даёт тот же результат, что и обработка на месте"""
+        data = photo()
+
+        self.assertEqual(
+            ingest.process(data), ingest.reencode(data, 100, 'JPEG', 82)
+        )
+
+    @override_settings(METRICS_FLUSH_INTERVAL=0)
+    def test_fallback_logged_and_counted(self):
+        """Если обработка не удалась, загрузка сохраняется как есть,
+        а в журнал и метрики попадает отметка"""
+        registry.flush()
+        registry.store().clear()
+        with mock.patch.object(ingest, 'reencode', side_effect=OSError):
+            with self.assertLogs('posts.ingest', 'WARNING'):
+                post = self.new_post()
+
+        self.assertEqual(post.image.read(), photo())
+        self.assertIn(
+            'yatube_ingest_fallbacks_total 1\n', registry.exposition()
+        )
+
+    def test_pool_follows_setting(self):
+        """Пул пересоздаётся при смене числа процессов"""
+        with override_settings(IMAGE_INGEST_WORKERS=1):
+            first = ingest.pool()
+            self.assertIs(ingest.pool(), first)
+        with override_settings(IMAGE_INGEST_WORKERS=2):
+            second = ingest.pool()
+
+        self.assertIsNot(second, first)
+        self.assertEqual(second._max_workers, 2)
@@ -0,0 +1,125 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts import fragments
+from posts.models import Comment, Group, Post
+
+USER = get_user_model()
+
+
+class AnonymousPageCacheTest(TestCase):
+    """Тестирование кэша страниц и условных GET-запросов"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = USER.objects.create_user(username='TestUser')
+        cls.guest_client = Client()
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+        cls.group = Group.objects.create(
+            title='Название группы',
+            slug='test',
+            description='Описание группы',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст',
+            group=cls.group,
+            author=cls.user,
+        )
+        cls.urls = (
+            reverse('index'),
+            reverse('group_posts', kwargs={'slug': 'test'}),
+            reverse('profile', kwargs={'username': 'TestUser'}),
+            reverse('post', kwargs={
+                'username': 'TestUser',
+                'post_id': cls.post.id,
+            }),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.start = time.time()
+
+    def at(self, seconds):
+        """Часы версий через seconds секунд после начала теста"""
+        return mock.patch.object(
+            fragments, '_now', return_value=self.start + seconds
+        )
+
+    def test_not_modified_for_matching_etag(self):
+        """Совпадающий ETag даёт ответ 304"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_not_modified_since_last_modified(self):
+        """Не изменившаяся страница даёт 304 по If-Modified-Since"""
+        with self.at(0):
+            response = self.guest_client.get(reverse('index'))
+        self.assertNotIn('Last-Modified', response)
+        with self.at(2):
+            response = self.guest_client.get(reverse('index'))
+            response = self.guest_client.get(
+                reverse('index'),
+                HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+            )
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_edits_move_last_modified(self):
+        """Правка записи сдвигает Last-Modified, хотя дата публикации
+        прежняя"""
+        url = self.urls[-1]
+        with self.at(0):
+            self.guest_client.get(url)
+        with self.at(2):
+            last_modified = self.guest_client.get(url)['Last-Modified']
+        with self.at(3):
+            self.post.text = 'Исправленный текст'
+            self.post.save()
+        with self.at(3.5):
+            response = self.guest_client.get(
+                url, HTTP_IF_MODIFIED_SINCE=last_modified
+            )
+            self.assertNotIn('Last-Modified', response)
+        self.assertContains(response, 'Исправленный текст')
+        with self.at(5):
+            response = self.guest_client.get(
+                url, HTTP_IF_MODIFIED_SINCE=last_modified
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['Last-Modified'], last_modified)
+
+    def test_cached_page_skips_rendering(self):
+        """Повторный запрос отдаётся из кэша без рендеринга"""
+        self.guest_client.get(reverse('index'))
+        response = self.guest_client.get(reverse('index'))
+
+        self.assertIsNone(response.context)
+        self.assertContains(response, 'Тестовый текст')
+
+    def test_writes_change_etag(self):
+        """Новый комментарий меняет ETag страницы поста"""
+        url = self.urls[-1]
+        etag = self.guest_client.get(url)['ETag']
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Новый комментарий'
+        )
+
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Новый комментарий')
+
+    def test_authorized_pages_are_not_cached(self):
+        """Страницы для авторизованных не кэшируются целиком"""
+        response = self.authorized_client.get(reverse('index'))
+
+        self.assertNotIn('ETag', response)
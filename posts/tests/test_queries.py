@@ -0,0 +1,122 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post, UserStats
+from posts.stats import get_stats
+from yatube.querycount import QueryBudgetMixin, QueryRecorder
+
+USER = get_user_model()
+
+
+class QueryBudgetTest(QueryBudgetMixin, TestCase):
+    """Проверяем бюджеты SQL-запросов страниц"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = USER.objects.create_user(username='TestUser')
+        cls.author = USER.objects.create_user(username='TestAuthor')
+        cls.guest_client = Client()
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.group = Group.objects.create(
+            title='Название группы',
+            slug='test',
+            description='Описание группы',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for i in range(12):
+            cls.post = Post.objects.create(
+                text=f'Тестовый текст {i}',
+                group=cls.group,
+                author=cls.author,
+            )
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text='Комментарий'
+            )
+        get_stats(cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_views_within_budget(self):
+        """Страницы укладываются в бюджет запросов без N+1"""
+        urls = (
+            reverse('index'),
+            reverse('group_posts', kwargs={'slug': 'test'}),
+            reverse('profile', kwargs={'username': 'TestAuthor'}),
+            reverse('post', kwargs={
+                'username': 'TestAuthor',
+                'post_id': self.post.id,
+            }),
+        )
+
+        for url in urls:
+            for client in (self.guest_client, self.authorized_client):
+                with self.subTest(url=url):
+                    self.assertWithinQueryBudget(client.get(url))
+        self.assertWithinQueryBudget(
+            self.authorized_client.get(reverse('follow_index'))
+        )
+
+    def test_cold_profile_within_budget(self):
+        """Профиль укладывается в бюджет, пока счётчики не сохранены"""
+        url = reverse('profile', kwargs={'username': 'TestAuthor'})
+        for client in (self.guest_client, self.authorized_client):
+            with self.subTest(client=client):
+                UserStats.objects.all().delete()
+                cache.clear()
+                self.assertWithinQueryBudget(client.get(url))
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 12
+        )
+
+    def test_writes_within_budget(self):
+        """Формы записи и правки укладываются в бюджет с рассылкой по
+        лентам подписчиков"""
+        edit_url = reverse('post_edit', kwargs={
+            'username': 'TestAuthor',
+            'post_id': self.post.id,
+        })
+        responses = (
+            self.author_client.get(reverse('new_post')),
+            self.author_client.post(
+                reverse('new_post'),
+                {'text': 'Новая запись', 'group': self.group.id}
+            ),
+            self.author_client.get(edit_url),
+            self.author_client.post(edit_url, {'text': 'Правка'}),
+        )
+
+        for response in responses:
+            with self.subTest(view=response.query_stats.view_name):
+                self.assertWithinQueryBudget(response)
+        self.assertTrue(
+            self.user.timeline.filter(post__text='Новая запись').exists()
+        )
+
+    def test_repeated_queries_are_flagged(self):
+        """Повторяющиеся запросы определяются как N+1"""
+        with QueryRecorder() as recorder:
+            for post in Post.objects.all()[:5]:
+                post.author.username
+
+        self.assertEqual(list(recorder.repeated().values()), [5])
+
+    @override_settings(QUERY_RECORD_SQL=False)
+    def test_only_counts_without_record_sql(self):
+        """Без QUERY_RECORD_SQL запросы только считаются"""
+        stats = self.guest_client.get(reverse('index')).query_stats
+
+        self.assertGreater(stats.count, 0)
+        self.assertEqual(stats.queries, [])
+        self.assertEqual(stats.repeated, {})
+
+    @override_settings(DEBUG=True)
+    def test_debug_summary_header(self):
+        """В режиме отладки ответ содержит сводку по запросам"""
+        response = self.guest_client.get(reverse('index'))
+
+        self.assertIn('budget 4', response['X-Query-Count'])
@@ -0,0 +1,131 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts import search
+from posts.models import Post
+from yatube.querycount import QueryBudgetMixin
+
+USER = get_user_model()
+
+
+class SearchTest(QueryBudgetMixin, TestCase):
+    """Тестирование полнотекстового поиска"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = USER.objects.create_user(username='TestUser')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def post(self, text):
+        return Post.objects.create(text=text, author=self.user)
+
+    def found(self, query):
+        return [post.text for post in search.search_page(query)]
+
+    def test_russian_word_forms(self):
+        """Находятся другие падежи и формы с буквой ё"""
+        self.post('Кошки любят молоко')
+        self.post('Ёжик в тумане')
+        self.post('Собака лает')
+
+        self.assertEqual(self.found('кошками'), ['Кошки любят молоко'])
+        self.assertEqual(self.found('ЕЖИКИ'), ['Ёжик в тумане'])
+        self.assertEqual(self.found('кошка молоком'), ['Кошки любят молоко'])
+        self.assertEqual(self.found('кошка собака'), [])
+
+    def test_fleeting_vowel(self):
+        """Формы с беглой гласной находят друг друга"""
+        self.post('Много кошек во дворе')
+        self.post('Сильный ветер')
+
+        self.assertEqual(self.found('кошками'), ['Много кошек во дворе'])
+        self.assertEqual(self.found('кошка'), ['Много кошек во дворе'])
+        self.assertEqual(self.found('ветра'), ['Сильный ветер'])
+        self.assertEqual(self.found('кошек'), ['Много кошек во дворе'])
+        self.post('Кошка спит')
+        self.assertEqual(
+            sorted(self.found('кошек')),
+            ['Кошка спит', 'Много кошек во дворе']
+        )
+
+    def test_bm25_ranking(self):
+        """Более релевантная запись идёт первой"""
+        self.post('Про погоду и немного про кота')
+        self.post('Кот, кот и ещё раз кот')
+
+        self.assertEqual(
+            self.found('кот'),
+            ['Кот, кот и ещё раз кот', 'Про погоду и немного про кота']
+        )
+
+    def test_index_follows_edits_and_deletes(self):
+        """Индекс обновляется при правке и удалении записи"""
+        post = self.post('Старый текст')
+        post.text = 'Новый текст'
+        post.save()
+
+        self.assertEqual(self.found('старый'), [])
+        self.assertEqual(self.found('новый'), ['Новый текст'])
+        post.delete()
+        self.assertEqual(self.found('новый'), [])
+
+    def test_rebuild_command(self):
+        """rebuild_search подхватывает изменения в обход сигналов"""
+        post = self.post('Старый текст')
+        Post.objects.filter(pk=post.pk).update(text='Новый текст')
+        call_command('rebuild_search', stdout=StringIO())
+
+        self.assertEqual(self.found('новый'), ['Новый текст'])
+
+    def test_keyset_pagination(self):
+        """Страницы результатов идут по курсору без повторов"""
+        for i in range(12):
+            self.post(f'Тестовый текст {i}')
+
+        first = search.search_page('тестовый')
+        second = search.search_page('тестовый', first.next_cursor)
+
+        self.assertEqual(len(first), 10)
+        self.assertEqual(len(second), 2)
+        self.assertIsNone(second.next_cursor)
+        self.assertFalse(
+            {post.pk for post in first} & {post.pk for post in second}
+        )
+
+    def test_search_view(self):
+        """Страница поиска показывает найденное в пределах бюджета"""
+        self.post('Кошки любят молоко')
+        self.post('Собака лает')
+
+        response = self.authorized_client.get(
+            reverse('search'), {'q': 'кошку'}
+        )
+        self.assertContains(response, 'Кошки любят молоко')
+        self.assertNotContains(response, 'Собака лает')
+        self.assertWithinQueryBudget(response)
+
+    def test_admin_uses_index(self):
+        """Поиск в админке идёт по тому же индексу"""
+        self.post('Кошки любят молоко')
+        self.post('Собака лает')
+        admin = USER.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        client = Client()
+        client.force_login(admin)
+
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'кошкам'}
+        )
+        self.assertEqual(
+            [post.text for post in response.context['cl'].result_list],
+            ['Кошки любят молоко']
+        )
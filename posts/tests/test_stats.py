@@ -0,0 +1,71 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Follow, Post, UserStats
+from posts.stats import get_stats
+
+USER = get_user_model()
+
+
+class UserStatsTest(TestCase):
+    """Тестирование счётчиков профиля"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = USER.objects.create_user(username='TestUser')
+        cls.author = USER.objects.create_user(username='TestAuthor')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются вместе с записями и подписками"""
+        get_stats(self.user)
+        get_stats(self.author)
+        post = Post.objects.create(text='Тестовый текст', author=self.author)
+        follow = Follow.objects.create(user=self.user, author=self.author)
+
+        self.assertEqual(
+            (get_stats(self.author).posts_count,
+             get_stats(self.author).followers_count,
+             get_stats(self.user).following_count),
+            (1, 1, 1)
+        )
+
+        post.delete()
+        follow.delete()
+        self.assertEqual(
+            (get_stats(self.author).posts_count,
+             get_stats(self.author).followers_count,
+             get_stats(self.user).following_count),
+            (0, 0, 0)
+        )
+
+    def test_profile_uses_counters(self):
+        """Профиль показывает счётчики без пересчёта"""
+        Post.objects.create(text='Тестовый текст', author=self.author)
+        get_stats(self.author)
+        UserStats.objects.filter(user=self.author).update(posts_count=7)
+
+        response = self.authorized_client.get(
+            reverse('profile', kwargs={'username': 'TestAuthor'})
+        )
+        self.assertEqual(response.context['posts_count'], 7)
+
+    def test_repair_stats_command(self):
+        """Команда repair_stats исправляет расхождения"""
+        Post.objects.create(text='Тестовый текст', author=self.author)
+        get_stats(self.author)
+        UserStats.objects.filter(user=self.author).update(
+            posts_count=7, followers_count=3
+        )
+
+        out = StringIO()
+        call_command('repair_stats', stdout=out)
+
+        stats = UserStats.objects.get(user=self.author)
+        self.assertEqual((stats.posts_count, stats.followers_count), (1, 0))
+        self.assertTrue(UserStats.objects.filter(user=self.user).exists())
+        self.assertIn('repaired 1', out.getvalue())
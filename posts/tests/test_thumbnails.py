@@ -0,0 +1,127 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from PIL import Image
+from posts import kvstore, thumbnails
+from posts.models import Post
+
+USER = get_user_model()
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_image(name='photo.png'):
+    content = BytesIO()
+    Image.new('RGB', (1200, 800), 'green').save(content, 'PNG')
+    return SimpleUploadedFile(name, content.getvalue(), 'image/png')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ThumbnailsTest(TestCase):
+    """Тестирование подготовки миниатюр при загрузке"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = USER.objects.create_user(username='TestUser')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        # The tests start generation themselves.
+        with mock.patch.object(thumbnails, 'submit'):
+            self.post = Post.objects.create(
+                text='Тестовый текст', author=self.user, image=make_image()
+            )
+
+    def cached(self):
+        return thumbnails.backend.get_cached(
+            self.post.image,
+            thumbnails.CARD_GEOMETRY,
+            **thumbnails.CARD_OPTIONS
+        )
+
+    def test_worker_generates_and_releases_lock(self):
+        """Фоновая задача создаёт миниатюру и снимает блокировку"""
+        self.assertIsNone(self.cached())
+        thumbnails._run(self.post)
+
+        thumbnail = self.cached()
+        self.assertIsNotNone(thumbnail)
+        self.assertEqual((thumbnail.width, thumbnail.height), (960, 339))
+        self.assertIsNone(cache.get(thumbnails.pending_key(self.post.image)))
+
+    def test_srcset_variants(self):
+        """Варианты для srcset не растягиваются шире исходника"""
+        thumbnails._run(self.post)
+        card = thumbnails.card(self.post.image)
+
+        self.assertEqual(
+            [variant.width for variant in card.variants],
+            [320, 640, 960, 1200]
+        )
+        self.assertIn(f'{card.url} 960w', card.srcset)
+
+    def test_unscheduled_image_gets_card_inline(self):
+        """Картинка без фоновой задачи получает миниатюру карточки сразу,
+        остальные варианты уходят в фон"""
+        with mock.patch.object(thumbnails, 'submit') as submit:
+            card = thumbnails.card(self.post.image)
+
+        self.assertEqual([variant.width for variant in card.variants], [960])
+        submit.assert_called_once_with(self.post)
+
+    def test_pending_image_is_not_generated_again(self):
+        """Пока миниатюра готовится, карточка получает оригинал"""
+        cache.add(thumbnails.pending_key(self.post.image), True)
+
+        self.assertIsNone(thumbnails.card(self.post.image))
+        self.assertIsNone(self.cached())
+
+    def test_submit_is_deduplicated(self):
+        """Повторная загрузка не ставит вторую задачу на ту же картинку"""
+        with mock.patch.object(thumbnails, 'executor') as executor:
+            self.assertTrue(thumbnails.submit(self.post))
+            self.assertFalse(thumbnails.submit(self.post))
+        self.assertEqual(executor.return_value.submit.call_count, 1)
+
+    def test_card_falls_back_to_original(self):
+        """Лента показывает оригинал до готовности миниатюры"""
+        cache.add(thumbnails.pending_key(self.post.image), True)
+        response = self.client.get('/')
+        self.assertContains(response, self.post.image.url)
+
+        thumbnails._run(self.post)
+        response = self.client.get('/')
+        self.assertContains(response, self.cached().url)
+        self.assertContains(response, 'srcset=')
+        self.assertContains(response, 'loading="lazy"')
+        self.assertNotContains(response, self.post.image.url)
+
+    def test_page_cards_in_one_lookup(self):
+        """Картинки всей страницы ищутся одним запросом к хранилищу"""
+        posts = [self.post] + [
+            Post.objects.create(
+                text='Тестовый текст', author=self.user, image=make_image()
+            )
+            for _ in range(9)
+        ]
+        for post in posts:
+            thumbnails._run(post)
+        client = Client()
+        client.force_login(self.user)
+
+        with mock.patch.object(kvstore, 'cache', mock.Mock(wraps=cache)) as c:
+            response = client.get('/')
+
+        self.assertEqual(c.get_many.call_count, 1)
+        self.assertEqual(c.get.call_count, 0)
+        self.assertEqual(response.content.count(b'srcset='), 10)
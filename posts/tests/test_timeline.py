@@ -0,0 +1,163 @@
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Follow, Post, Timeline
+from posts.paginator import POSTS_PER_PAGE
+
+USER = get_user_model()
+
+
+class TimelineTest(TestCase):
+    """Тестирование материализованной ленты подписок"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = USER.objects.create_user(username='TestUser')
+        cls.author = USER.objects.create_user(username='TestAuthor')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.old_post = Post.objects.create(
+            text='Старый пост',
+            author=cls.author,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_follow_backfills_timeline(self):
+        """Подписка добавляет в ленту уже опубликованные записи"""
+        self.authorized_client.get(
+            reverse('profile_follow', kwargs={'username': 'TestAuthor'})
+        )
+
+        self.assertTrue(
+            Timeline.objects.filter(user=self.user, post=self.old_post)
+            .exists()
+        )
+
+    def test_new_post_fans_out(self):
+        """Новая запись попадает в ленты подписчиков"""
+        Follow.objects.create(user=self.user, author=self.author)
+        self.author_client.post(reverse('new_post'), data={'text': 'Новый'})
+
+        response = self.authorized_client.get(reverse('follow_index'))
+        self.assertEqual(
+            [post.text for post in response.context['page']],
+            ['Новый', 'Старый пост']
+        )
+
+    def test_unfollow_prunes_timeline(self):
+        """Отписка убирает записи автора из ленты"""
+        Follow.objects.create(user=self.user, author=self.author)
+        self.authorized_client.get(
+            reverse('profile_unfollow', kwargs={'username': 'TestAuthor'})
+        )
+
+        self.assertFalse(Timeline.objects.filter(user=self.user).exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_celebrity_author_is_read_in_pull_mode(self):
+        """Записи автора с большим числом подписчиков читаются без ленты"""
+        reader = USER.objects.create_user(username='TestReader')
+        Follow.objects.create(user=reader, author=self.author)
+        Follow.objects.create(user=self.user, author=self.author)
+        Post.objects.create(text='Для всех', author=self.author)
+
+        self.assertFalse(
+            Timeline.objects.filter(post__text='Для всех').exists()
+        )
+        response = self.authorized_client.get(reverse('follow_index'))
+        self.assertContains(response, 'Для всех')
+
+    def feed(self):
+        """Тексты всех страниц ленты подписок, по курсорам"""
+        texts, url = [], reverse('follow_index')
+        while url:
+            page = self.authorized_client.get(url).context['page']
+            texts += [post.text for post in page]
+            url = page.next_cursor and (
+                reverse('follow_index') + f'?cursor={page.next_cursor}'
+            )
+        return texts
+
+    @override_settings(TIMELINE_BACKFILL_LIMIT=POSTS_PER_PAGE)
+    def test_pages_past_backfill_read_join(self):
+        """Записи старше обрезанного заполнения видны через join"""
+        for i in range(2 * POSTS_PER_PAGE):
+            Post.objects.create(text=f'Запись {i}', author=self.author)
+        self.authorized_client.get(
+            reverse('profile_follow', kwargs={'username': 'TestAuthor'})
+        )
+
+        self.assertEqual(
+            Timeline.objects.filter(user=self.user).count(), POSTS_PER_PAGE
+        )
+        self.assertIsNotNone(
+            Follow.objects.get(user=self.user).backfilled_from
+        )
+        self.assertEqual(self.feed(), [
+            post.text for post in Post.objects.filter(author=self.author)
+            .order_by('-pub_date', '-pk')
+        ])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_author_back_in_push_mode_is_backfilled_by_command(self):
+        """Вернувшийся в push-режим автор догружается командой, а до неё
+        читается через join"""
+        reader = USER.objects.create_user(username='TestReader')
+        Follow.objects.create(user=reader, author=self.author)
+        Follow.objects.create(user=self.user, author=self.author)
+        Post.objects.create(text='Для всех', author=self.author)
+        Follow.objects.get(user=reader).delete()
+
+        follow = Follow.objects.get(user=self.user)
+        self.assertIsNotNone(follow.backfilled_from)
+        self.assertFalse(
+            Timeline.objects.filter(post__text='Для всех').exists()
+        )
+        self.assertIn('Для всех', self.feed())
+
+        call_command('backfill_timelines', stdout=StringIO())
+        follow.refresh_from_db()
+        self.assertIsNone(follow.backfilled_from)
+        self.assertTrue(
+            Timeline.objects.filter(post__text='Для всех').exists()
+        )
+        self.assertEqual(self.feed(), ['Для всех', 'Старый пост'])
+
+    @override_settings(TIMELINE_BACKFILL_LIMIT=2, TIMELINE_FANOUT_LIMIT=1)
+    def test_fill_migration_is_bounded(self):
+        """Миграция заполнения копирует не больше лимита записей и
+        пропускает авторов в pull-режиме"""
+        fill_timeline = import_module(
+            'posts.migrations.0019_fill_timeline'
+        ).fill_timeline
+        celebrity = USER.objects.create_user(username='Celebrity')
+        reader = USER.objects.create_user(username='TestReader')
+        for index in range(3):
+            Post.objects.create(text=f'Запись {index}', author=self.author)
+            Post.objects.create(text=f'Звезда {index}', author=celebrity)
+        Follow.objects.bulk_create([
+            Follow(user=self.user, author=self.author),
+            Follow(user=self.user, author=celebrity),
+            Follow(user=reader, author=celebrity),
+        ])
+        Timeline.objects.all().delete()
+
+        fill_timeline(apps, None)
+
+        self.assertEqual(
+            list(Timeline.objects.order_by('-pub_date', '-post').values_list(
+                'post__text', flat=True
+            )),
+            ['Запись 2', 'Запись 1']
+        )
@@ -1,9 +1,12 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django import forms
 
-from posts.models import Post, Group
+from posts.models import Comment, Post, Group
 USER = get_user_model()
 
 
@@ -263,6 +266,9 @@ class PaginatorViewsTest(TestCase):
                 author=cls.user,
             )
 
+    def setUp(self):
+        cache.clear()
+
     def test_first_page_containse_ten_records(self):
         """Проверяем количество постов на 1ой странице"""
         response = self.client.get(reverse('index'))
@@ -275,6 +281,38 @@ class PaginatorViewsTest(TestCase):
 
         self.assertEqual(len(response.context.get('page').object_list), 3)
 
+    def test_cursor_navigation(self):
+        """Проверяем переход по курсорам вперёд и назад"""
+        first = self.client.get(reverse('index')).context['page']
+        self.assertIsNone(first.previous_cursor)
+
+        second = self.client.get(
+            reverse('index') + f'?cursor={first.next_cursor}'
+        ).context['page']
+        self.assertEqual(len(second.object_list), 3)
+        self.assertIsNone(second.next_cursor)
+
+        back = self.client.get(
+            reverse('index') + f'?cursor={second.previous_cursor}'
+        ).context['page']
+        self.assertEqual(list(back.object_list), list(first.object_list))
+        self.assertIsNone(back.previous_cursor)
+
+    def test_legacy_page_has_cursors(self):
+        """Проверяем курсоры на странице из старой ссылки ?page=N"""
+        response = self.client.get(reverse('index') + '?page=2')
+        page = response.context['page']
+
+        self.assertIsNotNone(page.previous_cursor)
+        self.assertIsNone(page.next_cursor)
+
+    def test_invalid_cursor_shows_first_page(self):
+        """Проверяем, что битый курсор ведёт на первую страницу"""
+        response = self.client.get(reverse('index') + '?cursor=broken')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page'].object_list), 10)
+
 
 class FollowViewsTest(TestCase):
     """Тестирование функционала подписок"""
@@ -317,8 +355,8 @@ class FollowViewsTest(TestCase):
 
     def test_feed_for_follower(self):
         """Проверяем ленту для подписчика"""
-        self.authorized_client.get('/TestUser2/follow/')
-        response = self.authorized_client.get('/follow/')
+        self.authorized_client2.get('/TestUser/follow/')
+        response = self.authorized_client2.get('/follow/')
         self.assertContains(response, 'Тестовый текст')
 
     def test_feed_for_not_follower(self):
@@ -336,3 +374,52 @@ class FollowViewsTest(TestCase):
         )
         response = self.authorized_client.get('/follow/')
         self.assertNotContains(response, 'Новый пост')
+
+
+class FeedQueriesTest(TestCase):
+    """Проверяем отсутствие N+1 запросов в ленте"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = USER.objects.create_user(username='TestUser')
+        cls.group = Group.objects.create(
+            title='Название группы',
+            slug='test',
+            description='Описание группы',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def create_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(
+                text=f'Тестовый текст {i}',
+                group=self.group,
+                author=self.user,
+            )
+            Comment.objects.create(post=post, author=self.user, text='Да')
+            Comment.objects.create(post=post, author=self.user, text='Нет')
+
+    def index_queries(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('index'))
+        return response, len(context.captured_queries)
+
+    def test_query_count_does_not_grow_with_page(self):
+        """Число запросов не зависит от числа постов на странице"""
+        self.create_posts(1)
+        _, one_post = self.index_queries()
+        self.create_posts(9)
+        _, ten_posts = self.index_queries()
+
+        self.assertEqual(one_post, ten_posts)
+
+    def test_comments_count_is_rendered(self):
+        """Счётчик комментариев выводится в карточке"""
+        self.create_posts(1)
+        response, _ = self.index_queries()
+
+        self.assertContains(response, 'Комментариев: 2')
+        self.assertContains(response, '#Название группы')
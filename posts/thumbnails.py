@@ -0,0 +1,226 @@
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.functional import SimpleLazyObject
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from yatube import tracing
+
+from . import fragments
+
+logger = logging.getLogger(__name__)
+
+CARD_GEOMETRY = '960x339'
+CARD_OPTIONS = {'crop': 'center', 'upscale': True}
+# Narrower and wider renditions of the card offered in srcset. They are
+# never upscaled: a wider copy of a small image only costs bytes.
+SRCSET_GEOMETRIES = ('320x113', '640x226', '1920x678')
+SRCSET_OPTIONS = {'crop': 'center', 'upscale': False}
+# Every thumbnail the templates ask for, generated together on upload.
+VARIANTS = ((CARD_GEOMETRY, CARD_OPTIONS),) + tuple(
+    (geometry, SRCSET_OPTIONS) for geometry in SRCSET_GEOMETRIES
+)
+PENDING_KEY = 'thumbnails:pending:{}'
+
+_executor = None
+_executor_lock = Lock()
+
+
+def pending_timeout():
+    return getattr(settings, 'THUMBNAIL_PENDING_TIMEOUT', 60)
+
+
+def workers():
+    return getattr(settings, 'THUMBNAIL_WORKERS', 2)
+
+
+class PostThumbnailBackend(ThumbnailBackend):
+    """sorl backend that can look a thumbnail up without generating it"""
+
+    def thumbnail_file(self, file_, geometry_string, **options):
+        """ImageFile the thumbnail is stored as, same as get_thumbnail"""
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+    def get_cached(self, file_, geometry_string, **options):
+        """The thumbnail if it is already generated, otherwise None"""
+        thumbnail = self.thumbnail_file(file_, geometry_string, **options)
+        return default.kvstore.get(thumbnail)
+
+
+backend = PostThumbnailBackend()
+
+
+def pending_key(image):
+    return PENDING_KEY.format(hashlib.md5(image.name.encode()).hexdigest())
+
+
+class Card:
+    """Card image of a post: the 960px thumbnail and its srcset"""
+
+    def __init__(self, thumbnail, variants):
+        self.thumbnail = thumbnail
+        by_width = {}
+        for variant in variants:
+            by_width.setdefault(variant.width, variant)
+        self.variants = [by_width[width] for width in sorted(by_width)]
+
+    @property
+    def url(self):
+        return self.thumbnail.url
+
+    @property
+    def srcset(self):
+        return ', '.join(
+            f'{variant.url} {variant.width}w' for variant in self.variants
+        )
+
+
+def lookup_many(images):
+    """Generated thumbnails by image name and variant, None if missing
+
+    All variants of all the images are read in one kvstore round-trip.
+    """
+
+    files = {
+        image.name: [
+            backend.thumbnail_file(image, geometry, **options)
+            for geometry, options in VARIANTS
+        ]
+        for image in images
+    }
+    stored = default.kvstore.get_many(
+        thumbnail for thumbnails in files.values() for thumbnail in thumbnails
+    )
+    return {
+        name: [stored.get(thumbnail.key) for thumbnail in thumbnails]
+        for name, thumbnails in files.items()
+    }
+
+
+def lookup(image):
+    return lookup_many([image])[image.name]
+
+
+def generate(image, variants=VARIANTS):
+    """Generates the thumbnail variants of the image"""
+
+    try:
+        for geometry, options in variants:
+            backend.get_thumbnail(image, geometry, **options)
+    except Exception:
+        logger.exception('Thumbnails of %s failed', image.name)
+
+
+def _run(post):
+    image = post.image
+    try:
+        missing = [
+            variant for variant, thumbnail in zip(VARIANTS, lookup(image))
+            if thumbnail is None
+        ]
+        if missing:
+            generate(image, missing)
+            # Cards cached with the original image are rendered again.
+            fragments.bump(*fragments.post_scopes(post))
+    finally:
+        cache.delete(pending_key(image))
+
+
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=workers(), thread_name_prefix='thumbnails'
+            )
+    return _executor
+
+
+def submit(post):
+    """Queues generation unless some process is already on this image"""
+
+    if cache.add(pending_key(post.image), True, pending_timeout()):
+        executor().submit(_run, post)
+        return True
+    return False
+
+
+def schedule(post):
+    """Pre-generates thumbnails of the post image once it is committed"""
+
+    if post.image:
+        transaction.on_commit(partial(submit, post))
+
+
+def card(image, found=None):
+    """Card image of the post image, or None while it is being generated
+
+    The card is served as soon as its 960px thumbnail exists; missing
+    srcset variants are queued in the background. Images that were never
+    scheduled get the 960px thumbnail inline, as sorl's ``{% thumbnail %}``
+    tag would do, under the same lock as the workers. ``found`` is the
+    image's entry from lookup_many() when the caller already has it.
+    """
+
+    if not image:
+        return None
+    with tracing.span('thumbnails.card', 'thumbnail', image=image.name):
+        return _card(image, found)
+
+
+def _card(image, found):
+    found = list(found or lookup(image))
+    if found[0] is None:
+        if not cache.add(pending_key(image), True, pending_timeout()):
+            return None
+        try:
+            generate(image, VARIANTS[:1])
+        finally:
+            cache.delete(pending_key(image))
+        found[0] = backend.get_cached(image, CARD_GEOMETRY, **CARD_OPTIONS)
+        if found[0] is None:
+            return None
+    if None in found:
+        submit(image.instance)
+    return Card(found[0], [thumbnail for thumbnail in found if thumbnail])
+
+
+def cards(posts):
+    """card() of every post on a page, by post id, from one lookup"""
+
+    with tracing.span('thumbnails.cards', 'thumbnail', posts=len(posts)):
+        found = lookup_many(post.image for post in posts if post.image)
+        return {
+            post.pk: card(post.image, found.get(post.image.name))
+            for post in posts
+        }
+
+
+def page_cards(page):
+    """Context with the cards of a page for post_item.html
+
+    They are resolved on first use, so a page whose fragment comes from
+    the cache looks nothing up.
+    """
+
+    return {'cards': SimpleLazyObject(partial(cards, page.object_list))}
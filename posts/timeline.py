@@ -0,0 +1,169 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from .models import Follow, Post, Timeline
+from .paginator import paginate
+
+PULL_AUTHORS_KEY = 'timeline:pull_authors'
+PULL_AUTHORS_TIMEOUT = 60 * 60
+
+
+def fanout_limit():
+    return getattr(settings, 'TIMELINE_FANOUT_LIMIT', 1000)
+
+
+def backfill_limit():
+    return getattr(settings, 'TIMELINE_BACKFILL_LIMIT', 200)
+
+
+def pull_authors():
+    """Ids of authors with too many followers to fan out their posts"""
+
+    authors = cache.get(PULL_AUTHORS_KEY)
+    if authors is None:
+        authors = set(
+            Follow.objects.values('author')
+            .annotate(followers=Count('id'))
+            .filter(followers__gt=fanout_limit())
+            .values_list('author', flat=True)
+        )
+        cache.set(PULL_AUTHORS_KEY, authors, PULL_AUTHORS_TIMEOUT)
+    return authors
+
+
+def followers_count(author_id):
+    return Follow.objects.filter(author=author_id).count()
+
+
+def fan_out(post):
+    """Copies a new post into the timelines of the author's followers"""
+
+    followers = list(
+        Follow.objects.filter(author=post.author_id)
+        .values_list('user', flat=True)[:fanout_limit() + 1]
+    )
+    if len(followers) > fanout_limit():
+        cache.delete(PULL_AUTHORS_KEY)
+        return
+    Timeline.objects.bulk_create(
+        [
+            Timeline(
+                user_id=user_id,
+                post=post,
+                author_id=post.author_id,
+                pub_date=post.pub_date
+            )
+            for user_id in followers
+        ],
+        ignore_conflicts=True
+    )
+
+
+def backfill(user_id, author_id):
+    """Adds the latest posts of a newly followed author to a timeline
+
+    Returns the pub_date older posts of the author are missing from the
+    timeline before, when there are more than the limit, otherwise None.
+    """
+
+    if author_id in pull_authors():
+        return None
+    posts = list(Post.objects.filter(
+        author=author_id
+    ).order_by('-pub_date', '-pk').values_list(
+        'pk', 'pub_date'
+    )[:backfill_limit() + 1])
+    truncated = len(posts) > backfill_limit()
+    posts = posts[:backfill_limit()]
+    Timeline.objects.bulk_create(
+        [
+            Timeline(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date
+            )
+            for post_id, pub_date in posts
+        ],
+        ignore_conflicts=True
+    )
+    return posts[-1][1] if truncated else None
+
+
+def prune(user_id, author_id):
+    """Removes an unfollowed author's posts from a timeline"""
+
+    Timeline.objects.filter(user=user_id, author=author_id).delete()
+
+
+def on_follow(user_id, author_id):
+    if followers_count(author_id) == fanout_limit() + 1:
+        cache.delete(PULL_AUTHORS_KEY)
+    backfilled_from = backfill(user_id, author_id)
+    if backfilled_from is not None:
+        Follow.objects.filter(user=user_id, author=author_id).update(
+            backfilled_from=backfilled_from
+        )
+
+
+def on_unfollow(user_id, author_id):
+    prune(user_id, author_id)
+    if followers_count(author_id) != fanout_limit():
+        return
+    # The author has just dropped back to push mode, so the remaining
+    # followers never got the posts published in pull mode. Their feeds
+    # read those through the join until manage.py backfill_timelines
+    # copies them.
+    cache.delete(PULL_AUTHORS_KEY)
+    Follow.objects.filter(author=author_id).update(
+        backfilled_from=timezone.now()
+    )
+
+
+def refill(follow):
+    """Backfills a follow marked as incomplete, see backfill_timelines"""
+
+    follow.backfilled_from = backfill(follow.user_id, follow.author_id)
+    Follow.objects.filter(pk=follow.pk).update(
+        backfilled_from=follow.backfilled_from
+    )
+
+
+def feed_page(request):
+    """Page of the follow feed of request.user
+
+    Reads the materialized timeline, unless the user follows an author in
+    pull mode: then the feed falls back to the join through Follow. So do
+    pages reaching back past the newest backfilled_from of the user's
+    follows, where posts of some author are missing from the timeline.
+    """
+
+    user = request.user
+    authors = pull_authors()
+    aggregates = {'horizon': Max('backfilled_from')}
+    if authors:
+        aggregates['pulled'] = Count('pk', filter=Q(author__in=authors))
+    follows = Follow.objects.filter(user=user).aggregate(**aggregates)
+    joined = Post.objects.for_feed().filter(
+        author__in=Follow.objects.filter(user=user).values('author')
+    )
+    if follows.get('pulled'):
+        return paginate(request, joined)
+
+    page = paginate(request, Timeline.objects.filter(user=user), key='post_id')
+    entries = list(page.object_list)
+    horizon = follows['horizon']
+    if horizon is not None and not (
+        entries and entries[-1].pub_date > horizon and page.next_cursor
+    ):
+        # Cursors of timeline pages hold post ids, so they carry on here.
+        return paginate(request, joined)
+    posts = Post.objects.for_feed().in_bulk(
+        [entry.post_id for entry in entries]
+    )
+    page.object_list = [
+        posts[entry.post_id] for entry in entries if entry.post_id in posts
+    ]
+    return page
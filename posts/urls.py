@@ -1,17 +1,26 @@
 from django.urls import path
-from . import views
+from . import feeds, views
 
 urlpatterns = [
     path('', views.index, name='index'),
     path('group/<slug:slug>/', views.group_posts, name='group_posts'),
+    path('group/<slug:slug>/rss/', feeds.group_rss, name='group_rss'),
+    path('group/<slug:slug>/atom/', feeds.group_atom, name='group_atom'),
     path('new/', views.new_post, name='new_post'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('follow/<str:token>/rss/', feeds.follow_rss, name='follow_rss'),
+    path('follow/<str:token>/atom/', feeds.follow_atom, name='follow_atom'),
+    path('search/', views.search, name='search'),
+    path('autocomplete/', views.autocomplete, name='autocomplete'),
     path('<str:username>/follow/',
          views.profile_follow, name='profile_follow'
          ),
     path('<str:username>/unfollow/',
          views.profile_unfollow, name='profile_unfollow'
          ),
+    path('<str:username>/export/', views.export_data, name='export'),
+    path('<str:username>/rss/', feeds.profile_rss, name='profile_rss'),
+    path('<str:username>/atom/', feeds.profile_atom, name='profile_atom'),
     path('<str:username>/', views.profile, name='profile'),
     path('<str:username>/<int:post_id>/', views.post_view, name='post'),
     path('<str:username>/<int:post_id>/edit/',
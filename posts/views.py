@@ -3,39 +3,73 @@ from .models import Post, Group, Comment, Follow
 from .forms import PostForm, CommentForm
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import get_user_model
-from django.core.paginator import Paginator
-from django.http import HttpResponseForbidden, HttpResponseNotAllowed
+from django.http import (HttpResponseBadRequest, HttpResponseForbidden,
+                         HttpResponseNotAllowed, JsonResponse,
+                         StreamingHttpResponse)
+from . import export
+from .feeds import follow_token
+from .autocomplete import index as autocomplete_index
+from .fragments import feed_cache
+from .pagecache import (anonymous_page_cache, group_validators,
+                        index_validators, post_validators,
+                        profile_validators)
+from .paginator import paginate
+from .search import search_page
+from .stats import get_stats
+from .thumbnails import page_cards
+from .timeline import feed_page
+from yatube.writes import write_queue
 
 USER = get_user_model()
 
 
+@anonymous_page_cache(index_validators)
 def index(request):
     """Page renderer function for posts"""
 
-    post_list = Post.objects.all().order_by('-pub_date')
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    page = paginate(request, Post.objects.for_feed())
     return render(request, 'index.html', {
         'page': page,
+        **feed_cache(request, 'index', page, 'posts'),
+        **page_cards(page),
     })
 
 
+@anonymous_page_cache(group_validators)
 def group_posts(request, slug):
     """Page renderer function for community"""
 
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    page = paginate(request, group.posts.for_feed())
 
     return render(request, 'group.html', {
         'group': group,
         'page': page,
+        **feed_cache(request, 'group', page, f'group:{group.id}'),
+        **page_cards(page),
     })
 
 
+def search(request):
+    """Full-text search over posts"""
+
+    query = request.GET.get('q', '').strip()
+    page = search_page(query, request.GET.get('cursor'))
+    return render(request, 'search.html', {
+        'query': query,
+        'page': page,
+        **page_cards(page),
+    })
+
+
+def autocomplete(request):
+    """Users and groups whose name starts with ?q=, as JSON"""
+
+    query = request.GET.get('q', '').strip()
+    results = autocomplete_index.lookup(query) if query else []
+    return JsonResponse({'results': results})
+
+
 @login_required
 def new_post(request):
     """New post renderer function for users"""
@@ -49,62 +83,61 @@ def new_post(request):
         if form.is_valid():
             new_post = form.save(commit=False)
             new_post.author = request.user
-            new_post.save()
+            write_queue.run(new_post.save)
             return redirect('index')
     return render(request, 'post_form.html', {'form': form})
 
 
+@anonymous_page_cache(profile_validators)
 def profile(request, username):
     """Profile renderer function for users"""
 
     user_profile = get_object_or_404(USER, username=username)
-    post_list = Post.objects.filter(
-        author=user_profile
-    ).order_by('-pub_date')
-    posts_count = post_list.count()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    followers = Follow.objects.filter(author=user_profile.id).count()
-    follows = Follow.objects.filter(user=user_profile.id).count()
-    following = Follow.objects.filter(
+    page = paginate(
+        request,
+        Post.objects.for_feed().filter(author=user_profile)
+    )
+    stats = get_stats(user_profile)
+    following = request.user.is_authenticated and Follow.objects.filter(
         user=request.user.id, author=user_profile.id).exists()
 
     return render(request, 'profile.html', {
         'user_profile': user_profile,
         'page': page,
-        'posts_count': posts_count,
-        'followers': followers,
-        'follows': follows,
-        'following': following
+        'posts_count': stats.posts_count,
+        'followers': stats.followers_count,
+        'follows': stats.following_count,
+        'following': following,
+        **feed_cache(
+            request, 'profile', page, f'author:{user_profile.id}'
+        ),
+        **page_cards(page),
     })
 
 
+@anonymous_page_cache(post_validators)
 def post_view(request, username, post_id):
     """Post view renderer function for users"""
 
     user_profile = get_object_or_404(USER, username=username)
-    post = get_object_or_404(Post, pk=post_id, author=user_profile)
-    post_list = Post.objects.filter(
-        author=user_profile
-    ).order_by('-pub_date')
-    posts_count = post_list.count()
+    post = get_object_or_404(
+        Post.objects.for_feed(), pk=post_id, author=user_profile
+    )
+    stats = get_stats(user_profile)
     form = CommentForm()
     comment_list = Comment.objects.filter(
         post=post
-    ).order_by('-created')
-    followers = Follow.objects.filter(author=user_profile.id).count()
-    follows = Follow.objects.filter(user=user_profile.id).count()
-    following = Follow.objects.filter(
-        user=request.user.id, author=user_profile.id).all()
+    ).select_related('author').order_by('-created')
+    following = request.user.is_authenticated and Follow.objects.filter(
+        user=request.user.id, author=user_profile.id).exists()
     return render(request, 'post.html', {
         'user_profile': user_profile,
         'post': post,
-        'posts_count': posts_count,
+        'posts_count': stats.posts_count,
         'comment_list': comment_list,
         'form': form,
-        'followers': followers,
-        'follows': follows,
+        'followers': stats.followers_count,
+        'follows': stats.following_count,
         'following': following
     })
 
@@ -112,8 +145,11 @@ def post_view(request, username, post_id):
 def post_edit(request, username, post_id):
     """Post edit renderer function for users"""
 
-    user = get_object_or_404(USER, username=username)
-    post = get_object_or_404(Post, id=post_id, author=user)
+    post = get_object_or_404(
+        Post.objects.select_related('author'),
+        id=post_id, author__username=username
+    )
+    user = post.author
 
     if request.user != user:
         return redirect(
@@ -129,7 +165,8 @@ def post_edit(request, username, post_id):
     )
 
     if request.method == 'POST' and form.is_valid():
-        form.save()
+        # The image is ingested before the write lock is taken.
+        write_queue.run(form.save(commit=False).save)
         return redirect(
             'post',
             username=request.user.username,
@@ -152,7 +189,7 @@ def add_comment(request, username, post_id):
             new_comment = form.save(commit=False)
             new_comment.author = request.user
             new_comment.post = post
-            new_comment.save()
+            write_queue.submit(new_comment.save)
             return redirect(
                 'post',
                 username=post.author.username,
@@ -167,23 +204,49 @@ def add_comment(request, username, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user).all().order_by('-pub_date')
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    page = feed_page(request)
     return render(request, 'follow.html', {
         'page': page,
-        'paginator': paginator
+        'paginator': page.paginator,
+        'feed_token': follow_token(request.user),
+        **feed_cache(
+            request, 'follow', page, f'follow:{request.user.id}', 'posts'
+        ),
+        **page_cards(page),
     })
 
 
+@login_required
+def export_data(request, username):
+    """Streams the user's posts and comments as JSONL or CSV"""
+
+    user = get_object_or_404(USER, username=username)
+    if request.user != user and not request.user.is_staff:
+        return HttpResponseForbidden()
+    export_format = request.GET.get('format', 'jsonl')
+    if export_format not in export.FORMATS:
+        return HttpResponseBadRequest()
+
+    response = StreamingHttpResponse(
+        export.lines(user.id, export_format),
+        content_type=export.CONTENT_TYPES[export_format]
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{user.username}.{export_format}"'
+    )
+    return response
+
+
 @login_required
 def profile_follow(request, username):
     user = request.user
     user_profile = get_object_or_404(USER, username=username)
 
     if user_profile.id != user.id:
-        Follow.objects.get_or_create(user=request.user, author=user_profile)
+        write_queue.run(
+            Follow.objects.get_or_create, user=request.user,
+            author=user_profile
+        )
     else:
         return HttpResponseForbidden()
     return redirect(
@@ -195,10 +258,10 @@ def profile_follow(request, username):
 @login_required
 def profile_unfollow(request, username):
     user_profile = get_object_or_404(USER, username=username)
-    Follow.objects.filter(
+    write_queue.run(Follow.objects.filter(
         user=request.user,
         author=user_profile
-    ).delete()
+    ).delete)
     return redirect(
         'profile',
         username=username
@@ -1,4 +1,20 @@
+import pytest
+
+from yatube.testing import commit_hooks, scratch_files
+
 pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(autouse=True, scope='session')
+def scratch_cache(django_test_environment):
+    with scratch_files():
+        yield
+
+
+@pytest.fixture(autouse=True, scope='session')
+def run_commit_hooks(django_test_environment):
+    with commit_hooks():
+        yield
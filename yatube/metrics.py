@@ -0,0 +1,311 @@
+import atexit
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.backends.django import DjangoTemplates
+from django.utils.crypto import constant_time_compare
+
+# Upper bounds of the latency histogram buckets, in seconds.
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+UNRESOLVED = '<unresolved>'
+METRICS = {
+    'yatube_request_duration_seconds': (
+        'histogram', 'Time spent producing the response'
+    ),
+    'yatube_requests_total': ('counter', 'Responses by status code'),
+    'yatube_db_queries_total': ('counter', 'SQL queries run'),
+    'yatube_db_query_seconds_total': (
+        'counter', 'Time spent in SQL queries'
+    ),
+    'yatube_cache_hits_total': ('counter', 'Cache keys found'),
+    'yatube_cache_misses_total': ('counter', 'Cache keys not found'),
+    'yatube_template_render_seconds_total': (
+        'counter', 'Time spent rendering templates'
+    ),
+    'yatube_write_queue_depth': (
+        'histogram', 'Writes queued ahead of a write when it arrives'
+    ),
+    'yatube_write_wait_seconds_total': (
+        'counter', 'Time writes spent waiting for the write lock'
+    ),
+    'yatube_write_retries_total': (
+        'counter', 'Write transactions retried after a lock error'
+    ),
+    'yatube_write_batches_total': (
+        'counter', 'Transactions committing queued writes'
+    ),
+    'yatube_write_batched_total': (
+        'counter', 'Queued writes committed in those transactions'
+    ),
+}
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS samples ('
+    'name TEXT, labels TEXT, value REAL, PRIMARY KEY (name, labels))'
+)
+LE = re.compile(r'le="([^"]+)"')
+
+_local = threading.local()
+
+
+def location():
+    return getattr(
+        settings, 'METRICS_LOCATION',
+        os.path.join(settings.BASE_DIR, 'metrics.sqlite3')
+    )
+
+
+def flush_interval():
+    return getattr(settings, 'METRICS_FLUSH_INTERVAL', 5)
+
+
+def record(name, value=1):
+    """Adds to a per-request figure of the request this thread serves
+
+    Outside of a request, in worker threads or commands, it does nothing.
+    """
+
+    counters = getattr(_local, 'counters', None)
+    if counters is not None:
+        counters[name] += value
+
+
+class Store:
+    """Samples summed over all processes in a shared SQLite file"""
+
+    def __init__(self, path):
+        self._path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(
+                self._path, timeout=5, isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(SCHEMA)
+            local.connection = connection
+            local.pid = os.getpid()
+        return local.connection
+
+    def add(self, samples):
+        """Adds the {(name, labels): value} deltas in one transaction"""
+
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.executemany(
+                'INSERT INTO samples VALUES (?, ?, ?) '
+                'ON CONFLICT (name, labels) '
+                'DO UPDATE SET value = value + excluded.value',
+                [(name, labels, value)
+                 for (name, labels), value in samples.items()]
+            )
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def read(self):
+        return self._connection().execute(
+            'SELECT name, labels, value FROM samples'
+        ).fetchall()
+
+    def clear(self):
+        self._connection().execute('DELETE FROM samples')
+
+
+class Registry:
+    """Samples of this process not yet added to the store
+
+    Requests only touch a dict under a lock; the deltas reach the store
+    at most once per flush interval, so the file is written a few times
+    a second at worst whatever the traffic.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = defaultdict(float)
+        self._flushed = time.monotonic()
+        self._store = None
+        atexit.register(self.flush)
+
+    def store(self):
+        if self._store is None or self._store._path != location():
+            self._store = Store(location())
+        return self._store
+
+    def observe(self, view, status, seconds, figures):
+        label = f'view="{view}"'
+        with self._lock:
+            pending = self._pending
+            self._histogram(
+                'yatube_request_duration_seconds', label, seconds,
+                LATENCY_BUCKETS
+            )
+            pending['yatube_requests_total',
+                    f'{label},status="{status}"'] += 1
+            for name, value in figures.items():
+                pending[name, label] += value
+        self._flush_if_due()
+
+    def add(self, name, value=1, labels=''):
+        """Adds to a sample outside of the per-request figures"""
+
+        with self._lock:
+            self._pending[name, labels] += value
+        self._flush_if_due()
+
+    def histogram(self, name, value, buckets, labels=''):
+        with self._lock:
+            self._histogram(name, labels, value, buckets)
+        self._flush_if_due()
+
+    def _histogram(self, name, labels, value, buckets):
+        pending = self._pending
+        prefix = f'{labels},' if labels else ''
+        for bound in buckets:
+            if value <= bound:
+                pending[f'{name}_bucket', f'{prefix}le="{bound}"'] += 1
+        pending[f'{name}_bucket', f'{prefix}le="+Inf"'] += 1
+        pending[f'{name}_sum', labels] += value
+        pending[f'{name}_count', labels] += 1
+
+    def _flush_if_due(self):
+        if time.monotonic() - self._flushed >= flush_interval():
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(float)
+            self._flushed = time.monotonic()
+        if pending:
+            self.store().add(pending)
+
+    def exposition(self):
+        """Every process's samples in the Prometheus text format"""
+
+        self.flush()
+        families = defaultdict(list)
+        for name, labels, value in self.store().read():
+            family = re.sub(r'_(bucket|sum|count)$', '', name)
+            if family not in METRICS:
+                family = name
+            families[family].append((name, labels, value))
+        lines = []
+        for family in sorted(families):
+            kind, help_text = METRICS.get(family, ('untyped', ''))
+            lines.append(f'# HELP {family} {help_text}')
+            lines.append(f'# TYPE {family} {kind}')
+            for name, labels, value in sorted(
+                families[family], key=sample_order
+            ):
+                if labels:
+                    name = f'{name}{{{labels}}}'
+                lines.append(f'{name} {format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def format_value(value):
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def sample_order(sample):
+    name, labels, _ = sample
+    bound = LE.search(labels)
+    return (
+        LE.sub('', labels), name,
+        float(bound.group(1)) if bound else 0.0
+    )
+
+
+registry = Registry()
+
+
+class MetricsMiddleware:
+    """Records latency, status, queries, cache and template time per view
+
+    It must come before QueryCountMiddleware, whose query_stats it reads.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _local.counters = counters = defaultdict(float)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _local.counters = None
+        seconds = time.perf_counter() - start
+
+        match = request.resolver_match
+        stats = getattr(response, 'query_stats', None)
+        figures = {
+            'yatube_cache_hits_total': counters['cache_hits'],
+            'yatube_cache_misses_total': counters['cache_misses'],
+            'yatube_template_render_seconds_total': counters['templates'],
+        }
+        if stats is not None:
+            figures['yatube_db_queries_total'] = stats.count
+            figures['yatube_db_query_seconds_total'] = stats.duration
+        registry.observe(
+            match.view_name if match else UNRESOLVED,
+            response.status_code, seconds, figures
+        )
+        return response
+
+
+class TimedTemplate:
+    """Template of the Django backend that records its render time"""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        start = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            record('templates', time.perf_counter() - start)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Django template backend timing every top-level render"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+def metrics_view(request):
+    """Metrics of all worker processes for Prometheus to scrape
+
+    Without a METRICS_TOKEN they are only shown in DEBUG.
+    """
+
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponseForbidden()
+    elif not constant_time_compare(
+        request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.exposition(), content_type=CONTENT_TYPE)
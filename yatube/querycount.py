@@ -0,0 +1,168 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.test.utils import override_settings
+from django.utils.functional import cached_property
+
+logger = logging.getLogger(__name__)
+
+IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+NUMBER = re.compile(r'\b\d+\b')
+
+
+def query_shape(sql):
+    """SQL with literals and IN lists folded, equal for repeated queries"""
+    return NUMBER.sub('?', IN_LIST.sub('IN (...)', sql))
+
+
+def record_sql():
+    """Whether requests keep their SQL, for the N+1 check and the log"""
+    return getattr(settings, 'QUERY_RECORD_SQL', False) or settings.DEBUG
+
+
+class QueryRecorder:
+    """Records every statement run on any connection inside the block
+
+    With ``keep_sql`` off only the count and the total time are kept.
+    """
+
+    def __init__(self, keep_sql=True):
+        self.keep_sql = keep_sql
+        self.queries = []
+        self.count = 0
+        self.duration = 0.0
+        self._stack = None
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.duration += duration
+            if self.keep_sql:
+                self.queries.append((sql, duration))
+
+    def repeated(self, threshold=None):
+        """Query shapes run at least ``threshold`` times: likely N+1"""
+        if threshold is None:
+            threshold = getattr(settings, 'N_PLUS_ONE_THRESHOLD', 3)
+        shapes = Counter(query_shape(sql) for sql, _ in self.queries)
+        return {
+            shape: times for shape, times in shapes.items()
+            if times >= threshold
+        }
+
+
+def query_budget(view_name):
+    return getattr(settings, 'QUERY_BUDGETS', {}).get(view_name)
+
+
+class QueryStats:
+    """What the middleware attaches to the response as ``query_stats``
+
+    Query shapes are only worked out when ``repeated`` is first read.
+    """
+
+    def __init__(self, view_name, recorder):
+        self.view_name = view_name
+        self.count = recorder.count
+        self.duration = recorder.duration
+        self.queries = [sql for sql, _ in recorder.queries]
+        self.budget = query_budget(view_name)
+        self._recorder = recorder
+
+    @cached_property
+    def repeated(self):
+        return self._recorder.repeated()
+
+    @property
+    def over_budget(self):
+        return self.budget is not None and self.count > self.budget
+
+    def summary(self):
+        summary = f'{self.count} queries, {self.duration * 1000:.1f} ms'
+        if self.budget is not None:
+            summary += f', budget {self.budget}'
+        if self.repeated:
+            summary += f', repeated {sum(self.repeated.values())}'
+        return summary
+
+
+class QueryCountMiddleware:
+    """Counts queries per request and checks them against the view budget
+
+    Only the count and time are recorded unless QUERY_RECORD_SQL or
+    DEBUG is on; then repeated queries are reported too, and in debug
+    mode the summary is sent in the ``X-Query-Count`` header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        keep_sql = record_sql()
+        with QueryRecorder(keep_sql) as recorder:
+            response = self.get_response(request)
+        match = request.resolver_match
+        stats = QueryStats(match.url_name if match else None, recorder)
+        response.query_stats = stats
+        if stats.over_budget or keep_sql and stats.repeated:
+            logger.warning(
+                'Queries of %s on %s: %s',
+                stats.view_name, request.path, stats.summary()
+            )
+        if settings.DEBUG:
+            response['X-Query-Count'] = stats.summary()
+        return response
+
+
+class QueryBudgetMixin:
+    """TestCase mixin failing on budget overruns and repeated queries"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls._record_sql = override_settings(QUERY_RECORD_SQL=True)
+        cls._record_sql.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        try:
+            super().tearDownClass()
+        finally:
+            cls._record_sql.disable()
+
+    def assertWithinQueryBudget(self, response):
+        stats = response.query_stats
+        self.assertIsNotNone(
+            stats.budget, f'No query budget for view {stats.view_name}'
+        )
+        if stats.over_budget:
+            self.fail(
+                f'{stats.view_name} ran {stats.count} queries, budget is '
+                f'{stats.budget}:\n' + '\n'.join(stats.queries)
+            )
+        if stats.repeated:
+            self.fail(
+                f'{stats.view_name} repeats queries (N+1):\n'
+                + '\n'.join(
+                    f'{times} x {shape}'
+                    for shape, times in stats.repeated.items()
+                )
+            )
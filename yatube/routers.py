@@ -0,0 +1,134 @@
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'primary_pin'
+SAFE_METHODS = ('GET', 'HEAD')
+# Sessions, users and permissions must be current whatever the lag.
+PRIMARY_APPS = ('auth', 'contenttypes', 'sessions')
+
+_local = threading.local()
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def replica_views():
+    return getattr(settings, 'REPLICA_VIEWS', ())
+
+
+def pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+
+
+def replica_cache_timeout():
+    return getattr(settings, 'REPLICA_CACHE_TIMEOUT', 10)
+
+
+def note_write():
+    """Pins the request of this thread to the primary, see ReplicaMiddleware
+
+    For writes made on its behalf by another thread.
+    """
+
+    _local.wrote = True
+
+
+def on_replica():
+    """Whether the request of this thread reads from a replica"""
+    return (getattr(_local, 'replica', None) is not None
+            and not getattr(_local, 'wrote', False))
+
+
+def cache_variant():
+    """Parts to add to the cache keys and ETags of what the request renders
+
+    A replica may lag behind the content versions a render is keyed by,
+    so its renders are also keyed by a REPLICA_CACHE_TIMEOUT long window
+    of time and go stale with it. Renders from the primary add nothing.
+    """
+
+    if not on_replica():
+        return ()
+    return 'replica', int(time.time() // replica_cache_timeout())
+
+
+def cache_timeout(timeout):
+    """The timeout, cut to REPLICA_CACHE_TIMEOUT for a replica render"""
+    if not on_replica():
+        return timeout
+    return min(timeout, replica_cache_timeout())
+
+
+class ReplicaRouter:
+    """Reads of the read-only views go to a replica, everything else to
+    the primary
+
+    ReplicaMiddleware picks the replica for a request; without one, and
+    inside transactions or after a write in the same request, reads stay
+    on the primary, as do the reads of PRIMARY_APPS. Pages and fragments
+    rendered from a replica are cached only briefly, see cache_variant.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = getattr(_local, 'replica', None)
+        if (alias is None or getattr(_local, 'wrote', False)
+                or model._meta.app_label in PRIMARY_APPS
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        note_write()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copies of the primary, migrated along with it.
+        if db in replicas():
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    """Sends the reads of REPLICA_VIEWS to a replica, with stickiness
+
+    A response to a request that wrote sets a short-lived cookie, and
+    the writer's requests read from the primary until it expires, so they
+    see their own writes whatever the replica lag.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _local.replica = None
+        _local.wrote = False
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = _local.wrote
+            _local.replica = None
+            _local.wrote = False
+        if wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=pin_seconds(), httponly=True,
+                samesite='Lax'
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        aliases = replicas()
+        if (aliases and request.method in SAFE_METHODS
+                and request.resolver_match.url_name in replica_views()
+                and PIN_COOKIE not in request.COOKIES):
+            _local.replica = random.choice(aliases)
@@ -51,6 +51,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yatube.tracing.TracingMiddleware',
+    'yatube.metrics.MetricsMiddleware',
+    'yatube.querycount.QueryCountMiddleware',
+    'yatube.slowqueries.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -58,6 +62,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'yatube.routers.ReplicaMiddleware',
+    'yatube.tracing.TracedViewMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -65,7 +71,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'yatube.metrics.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -86,13 +92,60 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Production profile of the SQLite databases. PRAGMAS are run on every
+# new connection, see yatube/sqlite_profile.py.
+
+SQLITE_PRODUCTION = {
+    # Connections are kept between requests instead of reopened.
+    'CONN_MAX_AGE': 60,
+    'PRAGMAS': {
+        # Readers no longer block the writer nor the writer readers.
+        'journal_mode': 'WAL',
+        # Safe with WAL: a power loss can only undo the last commits.
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        # Negative sizes are in KiB: 64 MiB of page cache.
+        'cache_size': -64 * 1024,
+        # Wait for the write lock instead of failing at once.
+        'busy_timeout': 5000,
+        'temp_store': 'MEMORY',
+    },
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        **SQLITE_PRODUCTION,
     }
 }
 
+# Read replica: a copy of the primary made with manage.py sync_replica,
+# e.g. DB_REPLICA=replica.sqlite3
+
+DATABASE_REPLICAS = []
+if os.environ.get('DB_REPLICA'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['DB_REPLICA'],
+        'TEST': {'MIRROR': 'default'},
+        **SQLITE_PRODUCTION,
+    }
+    DATABASE_REPLICAS.append('replica')
+DATABASE_ROUTERS = ['yatube.routers.ReplicaRouter']
+REPLICA_VIEWS = ('index', 'group_posts', 'profile', 'post', 'follow_index')
+REPLICA_PIN_SECONDS = 10
+# Pages and fragments read from a replica are cached this long at most
+REPLICA_CACHE_TIMEOUT = 10
+
+# Writes of a process take turns, small ones share a transaction; lock
+# errors are retried with jittered backoff, see yatube/writes.py
+
+WRITE_RETRIES = 5
+WRITE_BACKOFF = 0.05
+WRITE_BACKOFF_MAX = 1.0
+WRITE_BATCH_SIZE = 50
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -146,8 +199,118 @@ LOGOUT_REDIRECT_URL = "index"
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
+# One cache file shared by every worker process on the host
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'yatube.sqlite_cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
     }
 }
+
+# Tests run on a cache of their own, see yatube/testing.py
+
+TEST_RUNNER = 'yatube.testing.TestRunner'
+
+# Request metrics of all workers are summed in one file, see /metrics;
+# it is only open with the METRICS_TOKEN bearer token, or in DEBUG
+
+METRICS_LOCATION = os.path.join(BASE_DIR, 'metrics.sqlite3')
+METRICS_FLUSH_INTERVAL = 5
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Slow-query log, off unless a threshold in seconds is set
+
+SLOW_QUERY_THRESHOLD = None
+SLOW_QUERY_SAMPLE_RATE = 1.0
+SLOW_QUERY_LOG = os.path.join(BASE_DIR, 'slow_queries.log')
+SLOW_QUERY_LOG_BACKUPS = 5
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'slow_queries': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': SLOW_QUERY_LOG,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': SLOW_QUERY_LOG_BACKUPS,
+            'formatter': 'message',
+            'encoding': 'utf-8',
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'yatube.slowqueries': {
+            'handlers': ['slow_queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
+# Request traces in Chrome trace-event format, asked for with X-Trace
+
+TRACE_SAMPLE_RATE = 0.0
+TRACE_DIR = os.path.join(BASE_DIR, 'traces')
+TRACE_TOKEN = os.environ.get('TRACE_TOKEN')
+
+# Uploaded images are bounded and re-encoded in a pool of processes
+
+IMAGE_MAX_SIZE = 1920
+IMAGE_FORMAT = 'JPEG'
+IMAGE_QUALITY = 82
+IMAGE_KEEP_ORIGINALS = False
+IMAGE_INGEST_WORKERS = 2
+
+# Post thumbnails are generated on upload by a pool of worker threads
+
+THUMBNAIL_KVSTORE = 'posts.kvstore.CacheKVStore'
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_PENDING_TIMEOUT = 60
+
+# Follow timeline: authors with more followers are read in pull mode
+
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_BACKFILL_LIMIT = 200
+
+# Data exports are streamed, reading this many rows at a time
+
+EXPORT_CHUNK_SIZE = 2000
+
+# SQL queries allowed per request, by URL name, on the cold path: empty
+# caches, counters not stored yet, writes fanned out to followers and the
+# autocomplete index still being built. Statements are kept for the N+1
+# check with QUERY_RECORD_SQL or DEBUG, otherwise only counted.
+
+QUERY_RECORD_SQL = False
+
+QUERY_BUDGETS = {
+    'index': 4,
+    'group_posts': 5,
+    'profile': 8,
+    'post': 9,
+    'follow_index': 6,
+    'new_post': 9,
+    'post_edit': 7,
+    'search': 4,
+    'autocomplete': 2,
+    'post_list': 1,
+    'post_detail': 2,
+    'comment_list': 2,
+    'group_detail': 2,
+    'group_post_list': 2,
+    'user_detail': 3,
+    'user_post_list': 2,
+}
+N_PLUS_ONE_THRESHOLD = 3
+
+# Feed fragments are invalidated by content versions, so they can live long
+
+FEED_CACHE_TIMEOUT = 60 * 60 * 6
@@ -0,0 +1,181 @@
+import json
+import logging
+import math
+import random
+import time
+from contextlib import ExitStack
+from threading import Lock
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .querycount import query_shape
+
+logger = logging.getLogger(__name__)
+
+# Plans are kept per query shape, so a hot slow query is explained once.
+PLAN_CACHE_SIZE = 256
+UNRESOLVED = '<unresolved>'
+
+_plans = {}
+_plans_lock = Lock()
+
+
+def threshold():
+    """Duration in seconds above which queries are logged, None when off"""
+    return getattr(settings, 'SLOW_QUERY_THRESHOLD', None)
+
+
+def sample_rate():
+    return getattr(settings, 'SLOW_QUERY_SAMPLE_RATE', 1.0)
+
+
+def params_shape(params):
+    """Types of the parameters, never their values"""
+
+    if params is None:
+        return []
+    if isinstance(params, dict):
+        params = params.values()
+    return [type(param).__name__ for param in params]
+
+
+def explain(connection, sql, params):
+    """Query plan lines of a SELECT, None for other statements"""
+
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return None
+    if connection.vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        prefix = 'EXPLAIN '
+    # A backend cursor skips the execute wrappers, so the EXPLAIN is
+    # neither logged nor counted against the query budget.
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(prefix + sql, params)
+        rows = cursor.fetchall()
+    except Exception as error:
+        return [f'EXPLAIN failed: {error}']
+    finally:
+        cursor.close()
+    if connection.vendor == 'sqlite':
+        return [row[-1] for row in rows]
+    return [' '.join(map(str, row)) for row in rows]
+
+
+def cached_plan(connection, sql, params, shape):
+    with _plans_lock:
+        if shape in _plans:
+            return _plans[shape]
+    plan = explain(connection, sql, params)
+    with _plans_lock:
+        if len(_plans) >= PLAN_CACHE_SIZE:
+            _plans.pop(next(iter(_plans)))
+        _plans[shape] = plan
+    return plan
+
+
+class SlowQueryLogger:
+    """execute_wrapper writing queries slower than the threshold to the log
+
+    Each entry is one JSON line with the SQL, its shape, the parameter
+    types, the duration, the view and the query plan.
+    """
+
+    def __init__(self, request, limit, rate):
+        self.request = request
+        self.limit = limit
+        self.rate = rate
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            if duration >= self.limit and random.random() < self.rate:
+                self.log(sql, params, many, context, duration)
+
+    def log(self, sql, params, many, context, duration):
+        shape = query_shape(sql)
+        match = self.request.resolver_match
+        entry = {
+            'time': time.time(),
+            'view': match.view_name if match else UNRESOLVED,
+            'path': self.request.path,
+            'duration_ms': round(duration * 1000, 3),
+            'sql': sql,
+            'shape': shape,
+            'params': [] if many else params_shape(params),
+            'many': many,
+            'plan': None if many else cached_plan(
+                context['connection'], sql, params, shape
+            ),
+        }
+        logger.warning(json.dumps(entry, ensure_ascii=False))
+
+
+class SlowQueryMiddleware:
+    """Logs slow queries of each request, see SLOW_QUERY_THRESHOLD"""
+
+    def __init__(self, get_response):
+        if threshold() is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        wrapper = SlowQueryLogger(request, threshold(), sample_rate())
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(wrapper))
+            return self.get_response(request)
+
+
+def read_log(path, backups):
+    """Entries of the log and its rotated copies, oldest first"""
+
+    paths = [f'{path}.{index}' for index in range(backups, 0, -1)]
+    for name in paths + [path]:
+        try:
+            with open(name, encoding='utf-8') as log:
+                lines = log.readlines()
+        except FileNotFoundError:
+            continue
+        for line in lines:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def aggregate(entries):
+    """Entries grouped by query shape, the costliest in total first"""
+
+    shapes = {}
+    for entry in entries:
+        found = shapes.setdefault(entry['shape'], {
+            'shape': entry['shape'],
+            'count': 0,
+            'total_ms': 0.0,
+            'durations': [],
+            'views': set(),
+        })
+        found['count'] += 1
+        found['total_ms'] += entry['duration_ms']
+        found['durations'].append(entry['duration_ms'])
+        found['views'].add(entry['view'])
+        found['plan'] = entry['plan']
+        found['sql'] = entry['sql']
+    report = []
+    for found in shapes.values():
+        durations = sorted(found.pop('durations'))
+        found['max_ms'] = durations[-1]
+        found['p95_ms'] = durations[
+            max(math.ceil(len(durations) * 0.95) - 1, 0)
+        ]
+        found['views'] = sorted(found['views'])
+        found['total_ms'] = round(found['total_ms'], 3)
+        report.append(found)
+    return sorted(report, key=lambda found: -found['total_ms'])
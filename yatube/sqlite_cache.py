@@ -0,0 +1,259 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import metrics, tracing
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    'key TEXT PRIMARY KEY, value BLOB, expires REAL, accessed REAL)',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    # A running row count, so writes check the size without a COUNT(*).
+    'CREATE TABLE IF NOT EXISTS cache_size ('
+    'id INTEGER PRIMARY KEY CHECK (id = 0), entries INTEGER)',
+    'CREATE TRIGGER IF NOT EXISTS cache_inserted AFTER INSERT ON cache '
+    'BEGIN UPDATE cache_size SET entries = entries + 1; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_deleted AFTER DELETE ON cache '
+    'BEGIN UPDATE cache_size SET entries = entries - 1; END',
+    # Files made before the count start from an actual one.
+    'INSERT OR IGNORE INTO cache_size '
+    'VALUES (0, (SELECT COUNT(*) FROM cache))',
+)
+# Writes update rows in place: a REPLACE would delete without the trigger.
+UPSERT = (
+    'INSERT INTO cache VALUES (?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+    'value = excluded.value, expires = excluded.expires, '
+    'accessed = excluded.accessed'
+)
+# SQLite allows 999 host parameters per statement in older builds.
+MAX_PARAMS = 900
+
+
+def encode(value):
+    # Counters are stored as SQL integers, readable without unpickling.
+    if type(value) is int:
+        return value
+    return sqlite3.Binary(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+
+def decode(value):
+    if isinstance(value, int):
+        return value
+    return pickle.loads(value)
+
+
+class SQLiteCache(BaseCache):
+    """Cache in a WAL-mode SQLite file, shared by all processes of a host
+
+    Unlike LocMemCache every worker sees the same entries, so one
+    invalidation reaches all of them. Entries are evicted least recently
+    used first once MAX_ENTRIES is exceeded; the access time is refreshed
+    at most once per LRU_RESOLUTION seconds to keep reads mostly
+    read-only. ``incr`` runs in an immediate transaction and is atomic
+    across processes.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._busy_timeout = options.get('BUSY_TIMEOUT', 5)
+        self._lru_resolution = options.get('LRU_RESOLUTION', 30)
+        self._local = threading.local()
+
+    def _connection(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(
+                self._path,
+                timeout=self._busy_timeout,
+                isolation_level=None,
+                check_same_thread=False
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            local.connection = connection
+            local.pid = os.getpid()
+        return local.connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    @staticmethod
+    def _alive(expires, now):
+        return expires is None or expires > now
+
+    def _touch_accessed(self, connection, keys, now):
+        for start in range(0, len(keys), MAX_PARAMS):
+            chunk = keys[start:start + MAX_PARAMS]
+            connection.execute(
+                'UPDATE cache SET accessed = ? WHERE key IN '
+                f'({", ".join("?" * len(chunk))})',
+                [now, *chunk]
+            )
+
+    @staticmethod
+    def _size(connection):
+        return connection.execute(
+            'SELECT entries FROM cache_size'
+        ).fetchone()[0]
+
+    def _cull(self, connection, now):
+        if self._size(connection) <= self._max_entries:
+            return
+        connection.execute('DELETE FROM cache WHERE expires <= ?', [now])
+        count = self._size(connection)
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            connection.execute('DELETE FROM cache')
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE key IN '
+            '(SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+            [count // self._cull_frequency]
+        )
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        with tracing.span('cache.get_many', 'cache', keys=len(keys)):
+            return self._get_many(keys, version)
+
+    def _get_many(self, keys, version):
+        made = {self._key(key, version): key for key in keys}
+        connection = self._connection()
+        now = time.time()
+        found, stale = {}, []
+        made_keys = list(made)
+        for start in range(0, len(made_keys), MAX_PARAMS):
+            chunk = made_keys[start:start + MAX_PARAMS]
+            rows = connection.execute(
+                'SELECT key, value, expires, accessed FROM cache WHERE key IN '
+                f'({", ".join("?" * len(chunk))})',
+                chunk
+            )
+            for made_key, value, expires, accessed in rows:
+                if not self._alive(expires, now):
+                    continue
+                found[made[made_key]] = decode(value)
+                if accessed < now - self._lru_resolution:
+                    stale.append(made_key)
+        if stale:
+            self._touch_accessed(connection, stale, now)
+        metrics.record('cache_hits', len(found))
+        metrics.record('cache_misses', len(made) - len(found))
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout=timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        # A timeout of 0 caches nothing; no need to take the write lock.
+        if expires is not None and expires <= now:
+            return []
+        rows = [
+            (self._key(key, version), encode(value), expires, now)
+            for key, value in data.items()
+        ]
+        with self._transaction() as connection:
+            connection.executemany(UPSERT, rows)
+            self._cull(connection, now)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._transaction() as connection:
+            row = connection.execute(
+                'SELECT expires FROM cache WHERE key = ?', [key]
+            ).fetchone()
+            if row is not None and self._alive(row[0], now):
+                return False
+            connection.execute(
+                UPSERT,
+                [key, encode(value), self.get_backend_timeout(timeout), now]
+            )
+            self._cull(connection, now)
+        return True
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._transaction() as connection:
+            row = connection.execute(
+                'SELECT value, expires FROM cache WHERE key = ?', [key]
+            ).fetchone()
+            if row is None or not self._alive(row[1], now):
+                raise ValueError(f"Key '{key}' not found")
+            value = decode(row[0]) + delta
+            connection.execute(
+                'UPDATE cache SET value = ?, accessed = ? WHERE key = ?',
+                [encode(value), now, key]
+            )
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        cursor = self._connection().execute(
+            'UPDATE cache SET expires = ?, accessed = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            [self.get_backend_timeout(timeout), now, key, now]
+        )
+        return cursor.rowcount > 0
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        row = self._connection().execute(
+            'SELECT 1 FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            [key, time.time()]
+        ).fetchone()
+        return row is not None
+
+    def delete(self, key, version=None):
+        cursor = self._connection().execute(
+            'DELETE FROM cache WHERE key = ?', [self._key(key, version)]
+        )
+        return cursor.rowcount > 0
+
+    def delete_many(self, keys, version=None):
+        made_keys = [self._key(key, version) for key in keys]
+        with self._transaction() as connection:
+            connection.executemany(
+                'DELETE FROM cache WHERE key = ?',
+                [(key,) for key in made_keys]
+            )
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Django closes caches after every request; the connection is
+        # kept open on purpose and reused by the next request.
+        pass
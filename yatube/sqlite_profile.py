@@ -0,0 +1,16 @@
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def apply_pragmas(sender, connection, **kwargs):
+    """Runs the PRAGMAS of the database entry on a new SQLite connection
+
+    They go to the DB-API connection directly, so they are not counted
+    as queries of the request that happened to open the connection.
+    """
+
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in connection.settings_dict.get('PRAGMAS', {}).items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
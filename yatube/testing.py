@@ -0,0 +1,126 @@
+import os
+import shutil
+import tempfile
+from contextlib import ExitStack, contextmanager
+from unittest import mock
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.test import TestCase
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+@contextmanager
+def scratch_files():
+    """Points the file-backed cache, metrics and uploads at a throwaway
+    directory
+
+    Tests clear the cache at will; they must not do it to the one of the
+    site running from the same checkout, or leave files in it.
+    """
+
+    directory = tempfile.mkdtemp()
+    overrides = override_settings(
+        CACHES={
+            **settings.CACHES,
+            'default': {
+                **settings.CACHES['default'],
+                'LOCATION': os.path.join(directory, 'cache.sqlite3'),
+            },
+        },
+        METRICS_LOCATION=os.path.join(directory, 'metrics.sqlite3'),
+        MEDIA_ROOT=os.path.join(directory, 'media'),
+    )
+    overrides.enable()
+    try:
+        yield directory
+    finally:
+        overrides.disable()
+        shutil.rmtree(directory)
+
+
+def _test_depth(connection):
+    """Savepoints open when the innermost TestCase block was, or None"""
+    depths = getattr(connection, 'test_depths', None)
+    return depths[-1] if depths else None
+
+
+@contextmanager
+def commit_hooks():
+    """Runs on_commit callbacks in TestCase tests as if they committed
+
+    TestCase wraps its tests in transactions that are never committed,
+    so the callbacks would never run. Here its own atomic blocks do not
+    count: a callback registered outside of any other block runs at once
+    and one registered inside a block runs when the block exits, as in
+    autocommit mode.
+    """
+
+    enter_atomics = TestCase._enter_atomics.__func__
+    rollback_atomics = TestCase._rollback_atomics.__func__
+    on_commit = BaseDatabaseWrapper.on_commit
+    atomic_exit = transaction.Atomic.__exit__
+
+    def entered(cls):
+        atomics = enter_atomics(cls)
+        for alias in atomics:
+            connection = connections[alias]
+            connection.test_depths = [
+                *getattr(connection, 'test_depths', []),
+                len(connection.savepoint_ids),
+            ]
+        return atomics
+
+    def rolled_back(cls, atomics):
+        rollback_atomics(cls, atomics)
+        for alias in atomics:
+            connections[alias].test_depths.pop()
+
+    def registered(connection, func):
+        if len(connection.savepoint_ids) == _test_depth(connection):
+            func()
+        else:
+            on_commit(connection, func)
+
+    def exited(atomic, exc_type, exc_value, traceback):
+        atomic_exit(atomic, exc_type, exc_value, traceback)
+        connection = transaction.get_connection(atomic.using)
+        if (exc_type is None and not connection.needs_rollback
+                and len(connection.savepoint_ids)
+                == _test_depth(connection)):
+            # Callbacks of rolled back savepoints are dropped already.
+            due, connection.run_on_commit = connection.run_on_commit, []
+            for _, func in due:
+                func()
+
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch.object(
+            TestCase, '_enter_atomics', classmethod(entered)
+        ))
+        stack.enter_context(mock.patch.object(
+            TestCase, '_rollback_atomics', classmethod(rolled_back)
+        ))
+        stack.enter_context(mock.patch.object(
+            BaseDatabaseWrapper, 'on_commit', registered
+        ))
+        stack.enter_context(mock.patch.object(
+            transaction.Atomic, '__exit__', exited
+        ))
+        yield
+
+
+class TestRunner(DiscoverRunner):
+    """DiscoverRunner running the suite on scratch_files(), with
+    commit_hooks()"""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._scratch = ExitStack()
+        self._scratch.enter_context(scratch_files())
+        self._scratch.enter_context(commit_hooks())
+
+    def teardown_test_environment(self, **kwargs):
+        self._scratch.close()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,119 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from yatube.metrics import Registry, Store, registry
+
+WORKERS = 4
+ROUNDS = 50
+SAMPLE = ('yatube_requests_total', 'view="index",status="200"')
+
+
+def flush_requests(location, rounds):
+    """Worker process: adds its own counts to the shared file"""
+    store = Store(location)
+    for _ in range(rounds):
+        store.add({SAMPLE: 1})
+
+
+class MetricsTest(TestCase):
+    """Тестирование метрик запросов"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'metrics.sqlite3')
+        self.settings = override_settings(
+            METRICS_LOCATION=self.location, METRICS_FLUSH_INTERVAL=0,
+            METRICS_TOKEN='secret'
+        )
+        self.settings.enable()
+        # Figures left over by earlier tests are not counted here.
+        registry.flush()
+        registry.store().clear()
+        cache.clear()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.directory)
+
+    def scrape(self):
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_view_figures(self):
+        """Задержка, статус, запросы, кэш и шаблоны учитываются по view"""
+        get_user_model().objects.create_user(username='TestUser')
+        self.client.get(reverse('index'))
+        self.client.get(reverse('profile', args=['nobody']))
+        metrics = self.scrape()
+
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket'
+            '{view="index",le="+Inf"} 1', metrics
+        )
+        self.assertIn('yatube_request_duration_seconds_count'
+                      '{view="index"} 1', metrics)
+        self.assertIn(
+            'yatube_requests_total{view="profile",status="404"} 1', metrics
+        )
+        self.assertIn('# TYPE yatube_request_duration_seconds histogram',
+                      metrics)
+        for name in ('yatube_db_queries_total',
+                     'yatube_cache_misses_total',
+                     'yatube_template_render_seconds_total'):
+            line = next(
+                line for line in metrics.splitlines()
+                if line.startswith(f'{name}{{view="index"}}')
+            )
+            self.assertGreater(float(line.split()[-1]), 0, name)
+
+    def test_processes_are_summed(self):
+        """Счётчики всех процессов складываются в общем файле"""
+        context = multiprocessing.get_context('spawn')
+        workers = [
+            context.Process(
+                target=flush_requests, args=(self.location, ROUNDS)
+            )
+            for _ in range(WORKERS)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        other = Registry()
+        other.observe('index', 200, 0.01, {})
+        other.flush()
+
+        self.assertIn(
+            'yatube_requests_total{view="index",status="200"} '
+            f'{WORKERS * ROUNDS + 1}',
+            registry.exposition()
+        )
+
+    def test_token(self):
+        """С заданным токеном метрики отдаются только с ним"""
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(
+            self.client.get(
+                url, HTTP_AUTHORIZATION='Bearer secret'
+            ).status_code,
+            200
+        )
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_closed_without_token(self):
+        """Без токена метрики отдаются только в режиме отладки"""
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.client.get(url).status_code, 200)
@@ -0,0 +1,127 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+from posts.models import Post
+
+from yatube import routers
+from yatube.routers import PIN_COOKIE
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTest(TransactionTestCase):
+    """Тестирование чтения с реплики, скопированной из основной базы"""
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        connections.databases['replica'] = {
+            **connections.databases['default'],
+            'NAME': os.path.join(cls.directory, 'replica.sqlite3'),
+        }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections.databases['replica']
+        del connections._connections.replica
+        shutil.rmtree(cls.directory)
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='TestUser')
+        self.client = Client()
+        self.client.force_login(self.user)
+        Post.objects.create(text='До копии', author=self.user)
+        call_command('sync_replica', stdout=StringIO())
+        Post.objects.create(text='После копии', author=self.user)
+
+    def test_read_only_views_read_replica(self):
+        """Ленты читаются с реплики, запись идёт в основную базу"""
+        response = Client().get(reverse('index'))
+        self.assertContains(response, 'До копии')
+        self.assertNotContains(response, 'После копии')
+
+        self.client.post(reverse('new_post'), {'text': 'Новая запись'})
+        self.assertTrue(Post.objects.filter(text='Новая запись').exists())
+        self.assertFalse(
+            Post.objects.using('replica').filter(text='Новая запись').exists()
+        )
+
+    def test_writer_reads_primary(self):
+        """Автор записи следующими запросами читает основную базу"""
+        self.assertNotContains(
+            self.client.get(reverse('index')), 'После копии'
+        )
+
+        response = self.client.post(
+            reverse('new_post'), {'text': 'Новая запись'}
+        )
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, 'После копии')
+        self.assertContains(response, 'Новая запись')
+
+    def test_replica_pages_cached_briefly(self):
+        """Страницы с реплики кэшируются ненадолго и с валидаторами"""
+        reader = Client()
+        response = reader.get(reverse('index'))
+        self.assertNotContains(response, 'После копии')
+        etag = response['ETag']
+        self.assertEqual(
+            reader.get(reverse('index'), HTTP_IF_NONE_MATCH=etag).status_code,
+            304
+        )
+        self.assertNotContains(
+            self.client.get(reverse('index')), 'После копии'
+        )
+
+        call_command('sync_replica', stdout=StringIO())
+        self.assertNotContains(reader.get(reverse('index')), 'После копии')
+        later = time.time() + routers.replica_cache_timeout()
+        with mock.patch.object(routers, 'time') as clock:
+            clock.time.return_value = later
+            response = reader.get(reverse('index'), HTTP_IF_NONE_MATCH=etag)
+            self.assertContains(response, 'После копии')
+            self.assertNotEqual(response['ETag'], etag)
+            self.assertContains(
+                self.client.get(reverse('index')), 'После копии'
+            )
+
+    def test_primary_pages_not_mixed_with_replica(self):
+        """Страницы с основной базы кэшируются отдельно от реплики"""
+        reader = Client()
+        self.assertNotContains(reader.get(reverse('index')), 'После копии')
+        self.assertNotContains(
+            self.client.get(reverse('index')), 'После копии'
+        )
+
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertContains(reader.get(reverse('index')), 'После копии')
+            self.assertContains(
+                self.client.get(reverse('index')), 'После копии'
+            )
+
+    def test_auth_reads_primary(self):
+        """Пользователи и сессии читаются с основной базы"""
+        router = routers.ReplicaRouter()
+        routers._local.replica = 'replica'
+        routers._local.wrote = False
+        try:
+            self.assertIsNone(router.db_for_read(get_user_model()))
+            self.assertEqual(router.db_for_read(Post), 'replica')
+        finally:
+            routers._local.replica = None
@@ -0,0 +1,72 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from yatube.slowqueries import SlowQueryMiddleware
+
+
+class SlowQueryTest(TestCase):
+    """Тестирование журнала медленных запросов"""
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_off_by_default(self):
+        """Без порога middleware не подключается"""
+        with self.assertRaises(MiddlewareNotUsed):
+            SlowQueryMiddleware(lambda request: None)
+
+    @override_settings(SLOW_QUERY_THRESHOLD=0)
+    def test_entries_with_plan(self):
+        """Запрос выше порога пишется с видом, типами параметров и планом"""
+        get_user_model().objects.create_user(username='TestUser')
+        with self.assertLogs('yatube.slowqueries') as logs:
+            Client().get(reverse('profile', args=['TestUser']))
+        entries = [
+            json.loads(record.getMessage()) for record in logs.records
+        ]
+
+        user = next(
+            entry for entry in entries if 'auth_user' in entry['sql']
+            and entry['sql'].startswith('SELECT')
+        )
+        self.assertEqual(user['view'], 'profile')
+        self.assertEqual(user['params'][0], 'str')
+        self.assertTrue(any('auth_user' in line for line in user['plan']))
+        self.assertNotIn('TestUser', json.dumps(user['params']))
+
+    def test_report_by_shape(self):
+        """slowqueries сводит записи журнала и его копий по форме запроса"""
+        path = os.path.join(self.directory, 'slow.log')
+        entry = {
+            'view': 'index', 'duration_ms': 120.0, 'plan': ['SCAN posts_post'],
+            'sql': 'SELECT 1 WHERE id = 5', 'shape': 'SELECT ? WHERE id = ?',
+        }
+        with open(path, 'w') as log:
+            log.write(json.dumps(entry) + '\n')
+            log.write(json.dumps({**entry, 'duration_ms': 80.0}) + '\n')
+        with open(f'{path}.1', 'w') as log:
+            log.write(json.dumps({**entry, 'view': 'profile'}) + '\n')
+
+        out = StringIO()
+        call_command('slowqueries', log=path, json=True, stdout=out)
+        report = json.loads(out.getvalue())
+
+        self.assertEqual(len(report), 1)
+        self.assertEqual(report[0]['count'], 3)
+        self.assertEqual(report[0]['total_ms'], 320.0)
+        self.assertEqual(report[0]['max_ms'], 120.0)
+        self.assertEqual(report[0]['views'], ['index', 'profile'])
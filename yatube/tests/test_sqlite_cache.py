@@ -0,0 +1,155 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from yatube.sqlite_cache import SQLiteCache
+
+WORKERS = 4
+ROUNDS = 200
+
+
+def increment(cache):
+    """incr that restarts a culled counter from the clock, as
+    fragments.bump() does"""
+    while True:
+        try:
+            return cache.incr('counter')
+        except ValueError:
+            cache.add('counter', time.time_ns())
+
+
+def hammer(location, rounds, results):
+    """Worker process: counter increments mixed with sets and gets"""
+    # Far fewer entries than keys, so culling runs all along.
+    cache = SQLiteCache(location, {'OPTIONS': {'MAX_ENTRIES': 50}})
+    values = []
+    for i in range(rounds):
+        values.append(increment(cache))
+        cache.set(f'key:{os.getpid()}:{i % 100}', i)
+        cache.get(f'key:{os.getpid()}:{(i + 1) % 100}')
+        cache.add('shared', os.getpid())
+    results.put(values)
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    """Тестирование общего для процессов кэша"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = SQLiteCache(self.location, {})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_get_set_delete(self):
+        """Базовые операции работают как у остальных бэкендов"""
+        self.cache.set('key', {'value': [1, 2]})
+        self.cache.set_many({'a': 1, 'b': 'два'})
+
+        self.assertEqual(self.cache.get('key'), {'value': [1, 2]})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c']), {'a': 1, 'b': 'два'}
+        )
+        self.assertFalse(self.cache.add('a', 2))
+        self.assertTrue(self.cache.add('c', 3))
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.get('key', 'default'), 'default')
+
+    def test_expired_entries_are_missing(self):
+        """Просроченные записи не отдаются и могут быть добавлены заново"""
+        self.cache.set('key', 'value', 0.05)
+        time.sleep(0.1)
+
+        self.assertIsNone(self.cache.get('key'))
+        self.assertFalse(self.cache.has_key('key'))
+        self.assertTrue(self.cache.add('key', 'new'))
+
+    def test_zero_timeout_writes_nothing(self):
+        """Запись с нулевым сроком не попадает в кэш и не берёт блокировку"""
+        with mock.patch.object(self.cache, '_transaction') as transaction:
+            self.cache.set('key', 'value', 0)
+            self.cache.set_many({'a': 1}, 0)
+
+        transaction.assert_not_called()
+        self.assertIsNone(self.cache.get('key'))
+        count, = self.cache._connection().execute(
+            'SELECT COUNT(*) FROM cache'
+        ).fetchone()
+        self.assertEqual(count, 0)
+
+    def test_incr(self):
+        """incr работает для чисел и падает на отсутствующем ключе"""
+        self.cache.set('counter', 10)
+
+        self.assertEqual(self.cache.incr('counter', 5), 15)
+        self.assertEqual(self.cache.decr('counter'), 14)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_lru_eviction(self):
+        """При переполнении вытесняются давно не читавшиеся записи"""
+        cache = self.make_cache(
+            MAX_ENTRIES=10, CULL_FREQUENCY=2, LRU_RESOLUTION=0
+        )
+        for i in range(10):
+            cache.set(f'key{i}', i)
+            time.sleep(0.001)
+        cache.get('key0')
+        cache.set('overflow', 10)
+
+        self.assertEqual(cache.get('key0'), 0)
+        self.assertIsNone(cache.get('key1'))
+        self.assertEqual(cache.get('overflow'), 10)
+
+    def test_size_is_counted(self):
+        """Счётчик записей совпадает с их числом после любых операций"""
+        cache = self.make_cache(MAX_ENTRIES=10, CULL_FREQUENCY=3)
+        for i in range(25):
+            cache.set(f'key{i % 15}', i)
+            cache.add(f'added{i % 4}', i)
+        cache.delete('key14')
+        cache.delete_many(['key13', 'missing'])
+
+        connection = cache._connection()
+        count, = connection.execute('SELECT COUNT(*) FROM cache').fetchone()
+        self.assertEqual(cache._size(connection), count)
+        self.assertLessEqual(count, 11)
+        cache.clear()
+        self.assertEqual(cache._size(connection), 0)
+
+    def test_shared_between_processes(self):
+        """Несколько процессов атомарно увеличивают общий счётчик, даже
+        когда его вытесняет переполнение"""
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+        workers = [
+            context.Process(
+                target=hammer, args=(self.location, ROUNDS, results)
+            )
+            for _ in range(WORKERS)
+        ]
+        for worker in workers:
+            worker.start()
+        values = []
+        for _ in workers:
+            values += results.get(timeout=60)
+        for worker in workers:
+            worker.join(60)
+
+        self.assertEqual(
+            [worker.exitcode for worker in workers], [0] * WORKERS
+        )
+        # Every increment got a value of its own: none was lost.
+        self.assertEqual(len(set(values)), WORKERS * ROUNDS)
+        self.assertIsNotNone(self.cache.get('shared'))
@@ -0,0 +1,56 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connections
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import TransactionTestCase
+
+
+class SQLiteProfileTest(TransactionTestCase):
+    """Тестирование производственного профиля SQLite"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_pragmas_on_new_connection(self):
+        """PRAGMA профиля выполняются при открытии соединения"""
+        connection = DatabaseWrapper({
+            **connections.databases['default'],
+            **settings.SQLITE_PRODUCTION,
+            'NAME': os.path.join(self.directory, 'db.sqlite3'),
+        }, alias='profile')
+        connection.ensure_connection()
+        try:
+            raw = connection.connection
+            self.assertEqual(
+                raw.execute('PRAGMA journal_mode').fetchone(), ('wal',)
+            )
+            self.assertEqual(
+                raw.execute('PRAGMA synchronous').fetchone(), (1,)
+            )
+            self.assertEqual(
+                raw.execute('PRAGMA busy_timeout').fetchone(), (5000,)
+            )
+            self.assertEqual(
+                raw.execute('PRAGMA temp_store').fetchone(), (2,)
+            )
+        finally:
+            connection.close()
+
+    def test_bench_compares_profiles(self):
+        """bench_sqlite сравнивает оба профиля на копиях базы"""
+        get_user_model().objects.create_user(username='TestUser')
+        out = StringIO()
+        call_command(
+            'bench_sqlite', readers=1, writers=1, seconds=0.2, stdout=out
+        )
+        self.assertIn('plain', out.getvalue())
+        self.assertIn('production', out.getvalue())
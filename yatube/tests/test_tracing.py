@@ -0,0 +1,101 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Post
+
+from yatube import tracing
+
+
+class TracingTest(TestCase):
+    """Тестирование трассировки запросов"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        user = get_user_model().objects.create_user(username='TestUser')
+        for i in range(3):
+            Post.objects.create(text=f'Тестовый текст {i}', author=user)
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.settings = override_settings(
+            TRACE_DIR=self.directory, TRACE_TOKEN='secret'
+        )
+        self.settings.enable()
+        self.client = Client()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.directory)
+
+    def events(self, response, view='index'):
+        with open(os.path.join(self.directory, response['X-Trace'])) as f:
+            trace = json.load(f)
+        self.assertEqual(trace['otherData']['view'], view)
+        return trace['traceEvents']
+
+    def test_span_tree(self):
+        """Трасса содержит запрос, разбор URL, view, запросы к базе, шаблоны
+        и кэш"""
+        response = self.client.get(reverse('index'), HTTP_X_TRACE='secret')
+        events = self.events(response)
+        spans = {(event['cat'], event['name']) for event in events}
+
+        for expected in (('http', 'request'), ('http', 'resolve'),
+                         ('view', 'index'),
+                         ('template', 'index.html'),
+                         ('template', 'post_item.html'),
+                         ('cache', 'cache.get_many')):
+            self.assertIn(expected, spans)
+        self.assertTrue(any(event['cat'] == 'db' for event in events))
+        request = next(event for event in events if event['name'] == 'request')
+        resolve = next(event for event in events if event['name'] == 'resolve')
+        view = next(event for event in events if event['cat'] == 'view')
+        self.assertLessEqual(resolve['ts'] + resolve['dur'], view['ts'] + 1)
+        for event in events:
+            self.assertGreaterEqual(event['ts'], request['ts'])
+            self.assertLessEqual(
+                event['ts'] + event['dur'],
+                request['ts'] + request['dur'] + 1
+            )
+
+    def test_view_called_by_django(self):
+        """Ошибка view обрабатывается Django как обычно и попадает в
+        трассу"""
+        response = self.client.get(
+            reverse('profile', args=['nobody']), HTTP_X_TRACE='secret'
+        )
+        self.assertEqual(response.status_code, 404)
+        spans = {
+            (event['cat'], event['name'])
+            for event in self.events(response, 'profile')
+        }
+        self.assertIn(('view', 'profile'), spans)
+        self.assertIsNone(
+            tracing.TracedViewMiddleware(None).process_view(
+                None, None, (), {}
+            )
+        )
+
+    def test_off_without_header(self):
+        """Без заголовка или с чужим токеном трасса не пишется"""
+        plain = self.client.get(reverse('index'))
+        wrong = self.client.get(reverse('index'), HTTP_X_TRACE='guess')
+
+        self.assertNotIn('X-Trace', plain)
+        self.assertNotIn('X-Trace', wrong)
+        self.assertEqual(os.listdir(self.directory), [])
+        self.assertIs(tracing.span('cache.get_many'), tracing.NULL_SPAN)
+
+    @override_settings(TRACE_SAMPLE_RATE=1.0)
+    def test_sampled(self):
+        """Запросы трассируются с заданной вероятностью"""
+        response = self.client.get(reverse('index'))
+        self.assertTrue(self.events(response))
@@ -0,0 +1,163 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, OperationalError, connections
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from posts import fragments
+from posts.models import Comment, Follow, Post
+
+from yatube.metrics import registry
+from yatube.routers import PIN_COOKIE
+from yatube.writes import write_queue
+
+USER = get_user_model()
+AUTHORS = 5
+
+
+class Flaky:
+    """Функция, которая первые несколько вызовов падает с ошибкой"""
+
+    def __init__(self, failures, error):
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+        return 'ok'
+
+
+class WriteQueueTest(TransactionTestCase):
+    """Тестирование очереди записи в базу"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings = override_settings(
+            METRICS_LOCATION=os.path.join(self.directory, 'metrics.sqlite3'),
+            METRICS_FLUSH_INTERVAL=0, WRITE_BACKOFF=0
+        )
+        self.settings.enable()
+        # Figures left over by earlier tests are not counted here.
+        registry.flush()
+        registry.store().clear()
+        cache.clear()
+        self.user = USER.objects.create_user(username='TestUser')
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.directory)
+
+    def metrics(self):
+        return registry.exposition()
+
+    def test_lock_errors_retried(self):
+        """Запись, упавшая на блокировке, повторяется"""
+        write = Flaky(2, OperationalError('database is locked'))
+        self.assertEqual(write_queue.run(write), 'ok')
+        self.assertEqual(write.calls, 3)
+        self.assertIn('yatube_write_retries_total 2\n', self.metrics())
+
+    def test_other_errors_not_retried(self):
+        """Прочие ошибки не повторяются"""
+        write = Flaky(1, OperationalError('no such table: posts_post'))
+        with self.assertRaises(OperationalError):
+            write_queue.run(write)
+        self.assertEqual(write.calls, 1)
+
+    @override_settings(WRITE_RETRIES=2)
+    def test_retries_limited(self):
+        """После WRITE_RETRIES повторов ошибка блокировки пробрасывается"""
+        write = Flaky(10, OperationalError('database is locked'))
+        with self.assertRaises(OperationalError):
+            write_queue.run(write)
+        self.assertEqual(write.calls, 3)
+
+    def test_queued_writes_share_transaction(self):
+        """Ожидающие записи фиксируются одной транзакцией, ошибка одной
+        из них не мешает остальным"""
+        authors = [
+            USER.objects.create_user(username=f'Author{index}')
+            for index in range(AUTHORS)
+        ]
+        outcomes = {}
+
+        def submit(name, func, **kwargs):
+            try:
+                write_queue.submit(func, **kwargs)
+                outcomes[name] = None
+            except Exception as error:
+                outcomes[name] = error
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=submit, args=(
+                author.username, Follow.objects.get_or_create
+            ), kwargs={'user': self.user, 'author': author})
+            for author in authors
+        ] + [
+            threading.Thread(target=submit, args=(
+                'duplicate', USER.objects.create
+            ), kwargs={'username': 'TestUser'})
+        ]
+        # The lock is held until every write is queued behind it.
+        with write_queue._lock:
+            for thread in threads:
+                thread.start()
+            deadline = time.monotonic() + 5
+            while (write_queue.depth < len(threads)
+                   and time.monotonic() < deadline):
+                time.sleep(0.01)
+        for thread in threads:
+            thread.join()
+
+        self.assertIsInstance(outcomes.pop('duplicate'), IntegrityError)
+        self.assertEqual(list(outcomes.values()), [None] * AUTHORS)
+        self.assertEqual(
+            Follow.objects.filter(user=self.user).count(), AUTHORS
+        )
+        metrics = self.metrics()
+        self.assertIn('yatube_write_batches_total 1\n', metrics)
+        self.assertIn(f'yatube_write_batched_total {AUTHORS + 1}\n', metrics)
+        self.assertIn(
+            f'yatube_write_queue_depth_count {len(threads)}\n', metrics
+        )
+
+    def test_follows_bump_after_commit(self):
+        """Подписка записывается своей транзакцией, версии ленты подписок
+        меняются после её фиксации"""
+        author = USER.objects.create_user(username='Author')
+        scope = f'follow:{self.user.pk}'
+        before = fragments.versions(scope)
+        seen = []
+
+        def follow():
+            Follow.objects.create(user=self.user, author=author)
+            seen.append(fragments.versions(scope))
+
+        write_queue.run(follow)
+
+        self.assertEqual(seen, [before])
+        self.assertNotEqual(fragments.versions(scope), before)
+
+    def test_views_write_through_queue(self):
+        """Комментарий записывается через очередь, автор читает с основной
+        базы"""
+        post = Post.objects.create(text='Тестовый текст', author=self.user)
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse('add_comment', args=[self.user.username, post.pk]),
+            {'text': 'Комментарий'}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertTrue(Comment.objects.filter(text='Комментарий').exists())
+        self.assertIn('yatube_write_batches_total 1\n', self.metrics())
@@ -0,0 +1,220 @@
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+from django.utils.crypto import constant_time_compare
+
+_local = threading.local()
+
+
+def sample_rate():
+    return getattr(settings, 'TRACE_SAMPLE_RATE', 0.0)
+
+
+def trace_dir():
+    return getattr(
+        settings, 'TRACE_DIR', os.path.join(settings.BASE_DIR, 'traces')
+    )
+
+
+class Trace:
+    """Spans of one request as Chrome trace events"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.pid = os.getpid()
+        self.events = []
+
+    def add(self, name, category, start, end, args):
+        self.events.append({
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': round((start - self.start) * 1e6, 1),
+            'dur': round((end - start) * 1e6, 1),
+            'pid': self.pid,
+            'tid': threading.get_ident(),
+            'args': args,
+        })
+
+    def export(self, metadata):
+        return {
+            'traceEvents': self.events,
+            'displayTimeUnit': 'ms',
+            'otherData': metadata,
+        }
+
+
+class Span:
+    def __init__(self, trace, name, category, args):
+        self.trace = trace
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.trace.add(
+            self.name, self.category, self.start, time.perf_counter(),
+            self.args
+        )
+
+
+class NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+def span(name, category='app', **args):
+    """Context manager timing a block of the traced request
+
+    Without a trace on this thread it is a shared no-op object, so
+    instrumented code costs one attribute lookup when tracing is off.
+    """
+
+    trace = getattr(_local, 'trace', None)
+    if trace is None:
+        return NULL_SPAN
+    return Span(trace, name, category, args)
+
+
+def query_span(execute, sql, params, many, context):
+    with span('query', 'db', sql=sql, many=many):
+        return execute(sql, params, many, context)
+
+
+_template_render = None
+
+
+def traced_render(self, context):
+    trace = getattr(_local, 'trace', None)
+    if trace is None:
+        return _template_render(self, context)
+    with Span(trace, self.name or '<string>', 'template', {}):
+        return _template_render(self, context)
+
+
+def install():
+    """Times every template render, includes too, while a trace is on
+
+    The method in place is wrapped as found, so the test runner's own
+    instrumentation, installed before the first request, keeps working.
+    """
+
+    global _template_render
+    if Template._render is not traced_render:
+        _template_render = Template._render
+        Template._render = traced_render
+
+
+def requested(request):
+    """Whether the request asks for a trace in the X-Trace header
+
+    Any value is honored in debug mode, otherwise only TRACE_TOKEN.
+    """
+
+    value = request.META.get('HTTP_X_TRACE')
+    if not value:
+        return False
+    token = getattr(settings, 'TRACE_TOKEN', None)
+    if token:
+        return constant_time_compare(value, token)
+    return settings.DEBUG
+
+
+class TracingMiddleware:
+    """Builds a span tree of sampled requests and saves it for Perfetto
+
+    A request is traced when it asks to in the X-Trace header or falls
+    into TRACE_SAMPLE_RATE. The trace is written to TRACE_DIR and its
+    file name is returned in the X-Trace header. Goes first in
+    MIDDLEWARE, paired with TracedViewMiddleware at the end.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install()
+
+    def __call__(self, request):
+        if not (requested(request) or random.random() < sample_rate()):
+            return self.get_response(request)
+
+        _local.trace = trace = Trace()
+        try:
+            with ExitStack() as stack:
+                stack.enter_context(span('request', 'http', path=request.path))
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(query_span)
+                    )
+                response = self.get_response(request)
+        finally:
+            _local.trace = None
+
+        match = request.resolver_match
+        name = self.save(trace, {
+            'path': request.get_full_path(),
+            'method': request.method,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+        })
+        response['X-Trace'] = name
+        return response
+
+    def save(self, trace, metadata):
+        directory = trace_dir()
+        os.makedirs(directory, exist_ok=True)
+        name = f'{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}.json'
+        with open(os.path.join(directory, name), 'w') as output:
+            json.dump(trace.export(metadata), output)
+        return name
+
+
+class TracedViewMiddleware:
+    """Times URL resolution and the view of traced requests; last in
+    MIDDLEWARE
+
+    Django resolves the URL between this middleware's call and the
+    process_view hooks, so the resolve span covers those hooks too. The
+    view span runs from process_view to the response coming back, so it
+    takes in the view, process_exception handlers and the rendering of a
+    TemplateResponse, while Django still calls the view itself.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if getattr(_local, 'trace', None) is not None:
+            _local.resolve = time.perf_counter()
+        response = self.get_response(request)
+        view = getattr(_local, 'view', None)
+        if view is not None:
+            _local.view = None
+            name, start = view
+            _local.trace.add(name, 'view', start, time.perf_counter(), {})
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        trace = getattr(_local, 'trace', None)
+        if trace is not None:
+            now = time.perf_counter()
+            trace.add('resolve', 'http', _local.resolve, now, {})
+            _local.view = (request.resolver_match.view_name, now)
+        return None
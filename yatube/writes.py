@@ -0,0 +1,171 @@
+import random
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.db import transaction
+
+from . import routers
+from .metrics import registry
+
+# Upper bounds of the queue depth histogram buckets.
+DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64)
+
+
+def retries():
+    return getattr(settings, 'WRITE_RETRIES', 5)
+
+
+def backoff():
+    """Base delay in seconds before the first retry, doubled each time"""
+    return getattr(settings, 'WRITE_BACKOFF', 0.05)
+
+
+def backoff_max():
+    return getattr(settings, 'WRITE_BACKOFF_MAX', 1.0)
+
+
+def batch_size():
+    return getattr(settings, 'WRITE_BATCH_SIZE', 50)
+
+
+def is_lock_error(error):
+    """Whether SQLite gave up on a lock held by another connection"""
+
+    message = str(error).lower()
+    return isinstance(error, OperationalError) and (
+        'locked' in message or 'busy' in message
+    )
+
+
+def in_transaction():
+    return connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+
+class WriteQueue:
+    """Serializes the write transactions of this process
+
+    SQLite takes one writer at a time; threads of a process that race for
+    it only add to busy_timeout waits, so they take turns on a lock here
+    instead and contend with other processes alone. A transaction still
+    failing on a lock is retried with jittered exponential backoff.
+
+    Small writes are submitted: the thread that gets the lock commits
+    every write queued meanwhile in one transaction, each in a savepoint
+    of its own, and the others find their result ready.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queued = []
+        self._queued_lock = threading.Lock()
+        self._depth = 0
+
+    @property
+    def depth(self):
+        """Writes waiting for or holding the lock in this process"""
+        return self._depth
+
+    def run(self, func, *args, **kwargs):
+        """Calls func in a write transaction of its own and returns its
+        result
+
+        Inside a transaction already there is nothing to serialize or
+        retry, and func is just called.
+        """
+
+        if in_transaction():
+            return func(*args, **kwargs)
+        with self._turn():
+            return self._retrying(self._atomic, func, args, kwargs)
+
+    def submit(self, func, *args, **kwargs):
+        """Like run, but func may share its transaction with other writes
+
+        For short writes with no other effects than on the database, as
+        func may be called by another thread, and called again with the
+        rest of its batch on a retry. Effects deferred with
+        transaction.on_commit happen once, when the batch commits.
+        """
+
+        if in_transaction():
+            return func(*args, **kwargs)
+        future = Future()
+        with self._queued_lock:
+            self._queued.append((func, args, kwargs, future))
+        with self._turn():
+            while not future.done():
+                self._commit_batch()
+        # The write was made for the request of this thread.
+        routers.note_write()
+        return future.result()
+
+    @contextmanager
+    def _turn(self):
+        with self._queued_lock:
+            ahead = self._depth
+            self._depth += 1
+        registry.histogram('yatube_write_queue_depth', ahead, DEPTH_BUCKETS)
+        start = time.perf_counter()
+        try:
+            with self._lock:
+                registry.add(
+                    'yatube_write_wait_seconds_total',
+                    time.perf_counter() - start
+                )
+                yield
+        finally:
+            with self._queued_lock:
+                self._depth -= 1
+
+    def _commit_batch(self):
+        with self._queued_lock:
+            batch = self._queued[:batch_size()]
+            del self._queued[:batch_size()]
+        try:
+            outcomes = self._retrying(self._batch, batch)
+        except Exception as error:
+            outcomes = [(None, error)] * len(batch)
+        else:
+            registry.add('yatube_write_batches_total')
+            registry.add('yatube_write_batched_total', len(batch))
+        for (result, error), (_, _, _, future) in zip(outcomes, batch):
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def _atomic(self, func, args, kwargs):
+        with transaction.atomic():
+            return func(*args, **kwargs)
+
+    def _batch(self, batch):
+        outcomes = []
+        with transaction.atomic():
+            for func, args, kwargs, _ in batch:
+                try:
+                    outcomes.append((self._atomic(func, args, kwargs), None))
+                except Exception as error:
+                    # A lock error fails the whole batch, to be retried.
+                    if is_lock_error(error):
+                        raise
+                    outcomes.append((None, error))
+        return outcomes
+
+    def _retrying(self, attempt, *args):
+        for number in range(retries() + 1):
+            try:
+                return attempt(*args)
+            except OperationalError as error:
+                if not is_lock_error(error) or number == retries():
+                    raise
+            registry.add('yatube_write_retries_total')
+            time.sleep(random.uniform(
+                0, min(backoff_max(), backoff() * 2 ** number)
+            ))
+
+
+write_queue = WriteQueue()
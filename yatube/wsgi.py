@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# The autocomplete index is built as the worker starts, in the background,
+# rather than by the first lookup.
+from posts.autocomplete import index  # noqa: E402
+
+index.warm()